@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# benchmarks/bench_extract_plan.py - извлечение полей: цепочки .get() вручную vs item_plan
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from parsers.extract import LazyItemIndex, get_main, item_plan
+from benchmarks.payloads import make_search_payload
+
+ROWS = 500
+REPEATS = 20
+
+
+def hand_written(result_list):
+    """Цепочки .get(), как до плана извлечения (без счетчиков путей)"""
+    rows = []
+    for item in result_list:
+        main = get_main(item)
+        data = main.get('clickParam', {}).get('args', {})
+        ex_content = main.get('exContent', {})
+        title = (data.get('detailParams', {}).get('title')
+                 or ex_content.get('detailParams', {}).get('title')
+                 or data.get('title'))
+        rows.append((data.get('id'), data.get('publishTime'), title, data.get('price'),
+                     data.get('area') or ex_content.get('area')))
+    return rows
+
+
+def planned(result_list):
+    """Те же поля через item_plan"""
+    rows = []
+    get = item_plan.get
+    index = LazyItemIndex(result_list)
+    for item in result_list:
+        data, _ = item_plan.resolve_data(item, index)
+        rows.append((get('id', item, data), get('publish_time', item, data), get('title', item, data),
+                     get('price', item, data), get('location', item, data)))
+    return rows
+
+
+def bench(func, result_list):
+    best = float('inf')
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(result_list)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    payload = make_search_payload(rows=ROWS, missing_args_ratio=0.0)
+    result_list = payload['data']['resultList']
+
+    hand_time, hand_rows = bench(hand_written, result_list)
+    plan_time, plan_rows = bench(planned, result_list)
+    assert hand_rows == plan_rows
+
+    print(f"📦 {ROWS} строк (элементов: {len(result_list)}), поля: id, время, название, цена, место")
+    print(f"   ✍️ Цепочки .get():  {hand_time * 1000:8.2f} мс")
+    print(f"   📐 item_plan:       {plan_time * 1000:8.2f} мс  (x{plan_time / hand_time:.1f} медленнее: "
+          f"вызовы и счетчики путей)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# benchmarks/bench_json_codec.py - json (indent=2) vs компактный json vs orjson: ответы API и seen_ids.json
+#
+# Ответы API с resultList идут через потоковый разбор (parsers/stream.py), а он
+# всегда на стандартном json - кодек на нем не сказывается. orjson ускоряет только
+# разбор ответа целиком (stream=False, ответы без resultList) и файлы хранилища.
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from parsers.stream import ResultListStream
+from utils import jsoncodec
+from benchmarks.payloads import make_search_payload
+
+PAGES = 20
+ROWS = 500
+SEEN_IDS = 500_000
+BUCKET_SECONDS = 3600
+REPEATS = 3
+CHUNK_SIZE = 64 * 1024
+
+
+def bench(func):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def stream_items(raw: bytes) -> list:
+    """Путь ответов API в боте: фрагменты тела -> элементы resultList"""
+    chunks = (raw[i:i + CHUNK_SIZE] for i in range(0, len(raw), CHUNK_SIZE))
+    return list(ResultListStream.open(chunks))
+
+
+def make_seen_snapshot(rng: random.Random) -> dict:
+    """seen_ids.json в формате SeenIdsStore: корзины по часу -> ID"""
+    now = int(time.time())
+    buckets = {}
+    for _ in range(SEEN_IDS):
+        ts = now - rng.randint(0, 48 * 3600)
+        bucket = ts - ts % BUCKET_SECONDS + BUCKET_SECONDS
+        buckets.setdefault(bucket, []).append(str(1012000000000 + rng.randint(0, 10 ** 9)))
+    return {'buckets': buckets}
+
+
+def main():
+    rng = random.Random(42)
+    responses = [json.dumps(make_search_payload(rows=ROWS, page=page), ensure_ascii=False).encode()
+                 for page in range(1, PAGES + 1)]
+    total_mb = sum(map(len, responses)) / 1024 / 1024
+    snapshot = make_seen_snapshot(rng)
+
+    codecs = ['json'] + (['orjson'] if jsoncodec.ORJSON_AVAILABLE else [])
+    if not jsoncodec.ORJSON_AVAILABLE:
+        print("⚠️ orjson не установлен - сравнивается только стандартный json")
+
+    print(f"📦 Разбор {PAGES} ответов по {ROWS} строк ({total_mb:.1f} МБ):")
+    parse_times = {}
+    elapsed = bench(lambda: [stream_items(raw) for raw in responses])
+    print(f"   поток, любой кодек {elapsed * 1000:8.1f} мс  ({total_mb / elapsed:6.1f} МБ/с) - путь бота (json.raw_decode)")
+    for name in codecs:
+        codec = jsoncodec.select_codec(name)
+        parse_times[name] = bench(lambda: [codec.loads(raw) for raw in responses])
+        print(f"   целиком, {name:9s} {parse_times[name] * 1000:8.1f} мс  ({total_mb / parse_times[name]:6.1f} МБ/с, "
+              f"x{parse_times['json'] / parse_times[name]:.1f}) - только stream=False")
+
+    print(f"\n💾 Сохранение seen_ids.json ({SEEN_IDS} ID):")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'seen_ids.json'
+
+        def save(codec, pretty):
+            with open(path, 'wb') as f:
+                f.write(codec.dumps_bytes(snapshot, pretty))
+
+        stdlib = jsoncodec.select_codec('json')
+        baseline = bench(lambda: save(stdlib, True))
+        print(f"   json, indent=2 (было)  {baseline * 1000:8.1f} мс  {path.stat().st_size / 1024 / 1024:5.1f} МБ")
+        for name in codecs:
+            codec = jsoncodec.select_codec(name)
+            elapsed = bench(lambda: save(codec, False))
+            print(f"   {name + ', компактно':22s} {elapsed * 1000:8.1f} мс  {path.stat().st_size / 1024 / 1024:5.1f} МБ"
+                  f"  (x{baseline / elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
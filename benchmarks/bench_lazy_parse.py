@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# benchmarks/bench_lazy_parse.py - полный разбор страницы vs двухфазный (ID + время, затем остальное)
+import contextlib
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from parsers.goofish import GoofishParser
+from benchmarks.payloads import make_search_payload
+
+ROWS = 500
+REPEATS = 5
+
+
+def bench(func):
+    best = float('inf')
+    result = None
+    for _ in range(REPEATS):
+        with contextlib.redirect_stdout(io.StringIO()):  # Диагностика парсера не входит в замер
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = GoofishParser()
+    payload = make_search_payload(rows=ROWS, missing_args_ratio=0.1)
+    result_list = payload['data']['resultList']
+    all_ids = list({str(item['data']['item']['main']['exContent']['itemId']) for item in result_list})
+
+    for seen_ratio in (0.0, 0.5, 0.95):
+        parser.seen_ids = set(random.Random(42).sample(all_ids, int(len(all_ids) * seen_ratio)))
+
+        # Полный разбор: все поля для всех элементов, фильтр новизны потом
+        full_time, full = bench(lambda: parser._parse_response_debug(payload, 'stone island'))
+        lazy_time, lazy = bench(lambda: parser._parse_response_debug(payload, 'stone island', only_new=True))
+
+        print(f"📦 {ROWS} строк, уже видели: {seen_ratio:.0%} (новых: {len(lazy[0])} из {len(full[0])})")
+        print(f"   🐢 Полный разбор:     {full_time * 1000:8.2f} мс")
+        print(f"   ⚡ Двухфазный разбор: {lazy_time * 1000:8.2f} мс  (x{full_time / lazy_time:.1f})")
+
+
+if __name__ == "__main__":
+    main()
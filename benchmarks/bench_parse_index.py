@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# benchmarks/bench_parse_index.py - перекрестный поиск exContent: линейный перебор vs индекс
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from parsers.extract import build_item_index, get_click_args, get_ex_content
+from benchmarks.payloads import make_search_payload
+
+ROWS = 500
+REPEATS = 5
+
+
+def linear_lookup(result_list):
+    """Старый «Путь 2»: полный перебор resultList для каждого элемента"""
+    found = 0
+    for item in result_list:
+        if get_click_args(item):
+            continue
+        item_id = get_ex_content(item).get('itemId', '')
+        for elem in result_list:
+            args = elem.get('data', {}).get('item', {}).get('main', {}).get('clickParam', {}).get('args', {})
+            if args.get('id') == item_id:
+                found += 1
+                break
+    return found
+
+
+def indexed_lookup(result_list):
+    """Новый «Путь 2»: один проход для индекса + O(1) поиск"""
+    found = 0
+    index = build_item_index(result_list)
+    for item in result_list:
+        if get_click_args(item):
+            continue
+        if str(get_ex_content(item).get('itemId', '')) in index:
+            found += 1
+    return found
+
+
+def bench(func, result_list):
+    best = float('inf')
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(result_list)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    for ratio in (0.1, 0.5, 1.0):
+        payload = make_search_payload(rows=ROWS, missing_args_ratio=ratio)
+        result_list = payload['data']['resultList']
+
+        linear_time, linear_found = bench(linear_lookup, result_list)
+        indexed_time, indexed_found = bench(indexed_lookup, result_list)
+        assert linear_found == indexed_found
+
+        print(f"📦 {ROWS} строк, без args: {ratio:.0%} (элементов: {len(result_list)}, найдено: {indexed_found})")
+        print(f"   🐢 Линейный перебор: {linear_time * 1000:8.2f} мс")
+        print(f"   ⚡ Индекс страницы:  {indexed_time * 1000:8.2f} мс  (x{linear_time / indexed_time:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# benchmarks/bench_product_batch.py - фильтры возраста и seen_ids: список Product vs ProductBatch
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models import Product
+from core.batch import ProductBatchBuilder
+from storage.seen_index import MmapSeenIndex
+
+ROWS = 500
+PAGES = 50
+SEEN_RATIO = 0.95
+MAX_AGE_MINUTES = 1440
+REPEATS = 3
+
+
+def make_rows(rng: random.Random):
+    """Распарсенные строки страниц: (id, title, price, location, age, images)"""
+    pages = []
+    base_id = 1012000000000
+    for page in range(PAGES):
+        rows = []
+        for i in range(ROWS):
+            item_id = str(base_id + page * ROWS + i)
+            rows.append((
+                item_id,
+                f"stone island jacket {item_id[-4:]}",
+                float(rng.randint(50, 5000)),
+                rng.choice(['上海', '北京', '广州', '深圳', '杭州']),
+                (page * ROWS + i) * 0.1,
+                [f"https://img.alicdn.com/{item_id}.jpg"],
+            ))
+        pages.append(rows)
+    return pages
+
+
+def list_pipeline(pages, seen_ids):
+    """Старый путь: Product на каждую строку, затем фильтры списками"""
+    survivors = []
+    for rows in pages:
+        products = [
+            Product(id=item_id, title=title, price=price, url=f"https://www.goofish.com/item?id={item_id}",
+                    location=location, age_minutes=round(age, 1), query='stone island', images=images)
+            for item_id, title, price, location, age, images in rows
+        ]
+        products = [p for p in products if p.age_minutes <= MAX_AGE_MINUTES]
+        products = [p for p in products if p.id not in seen_ids]
+        survivors.extend(products)
+    return survivors
+
+
+def batch_pipeline(pages, seen_ids):
+    """Новый путь: колонки, маски по странице, Product только для оставшихся"""
+    survivors = []
+    for rows in pages:
+        builder = ProductBatchBuilder()
+        for item_id, title, price, location, age, images in rows:
+            builder.append(item_id, title, price, location, age, 'stone island', images)
+        batch = builder.build()
+        batch = batch.select(batch.age_mask(MAX_AGE_MINUTES))
+        batch = batch.select(~batch.seen_mask(seen_ids))
+        survivors.extend(batch.to_products())
+    return survivors
+
+
+def bench(func, *args):
+    best = float('inf')
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    rng = random.Random(42)
+    pages = make_rows(rng)
+    all_ids = [row[0] for rows in pages for row in rows]
+    seen = set(rng.sample(all_ids, int(len(all_ids) * SEEN_RATIO)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = MmapSeenIndex(Path(tmp) / 'seen.u64', Path(tmp) / 'seen.journal')
+        index.replace(seen)
+
+        list_time, list_result = bench(list_pipeline, pages, seen)
+        set_time, set_result = bench(batch_pipeline, pages, seen)
+        mmap_time, mmap_result = bench(batch_pipeline, pages, index)
+        index._current.close()
+        index._previous.close()
+
+    assert [p.id for p in list_result] == [p.id for p in set_result] == [p.id for p in mmap_result]
+
+    print(f"📦 {PAGES} стр. × {ROWS} строк, уже видели: {SEEN_RATIO:.0%} (осталось: {len(list_result)})")
+    print(f"   🐢 Список Product:             {list_time * 1000:8.2f} мс")
+    print(f"   ⚡ ProductBatch + set:          {set_time * 1000:8.2f} мс  (x{list_time / set_time:.1f})")
+    print(f"   ⚡ ProductBatch + mmap-индекс:  {mmap_time * 1000:8.2f} мс  (x{list_time / mmap_time:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# benchmarks/bench_seen_ids.py - seen_ids: перезапись JSON vs журнал добавлений
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from storage.seen_ids import SeenIdsStore
+
+TOTAL_IDS = 1_000_000
+BATCH = 100        # ID за один add_seen_ids (одна проверка запроса)
+BATCHES = 5
+
+
+def make_ids(start: int, count: int):
+    return [str(1012000000000 + i) for i in range(start, start + count)]
+
+
+def old_add_seen_ids(path: Path, new_ids):
+    """Старый add_seen_ids: прочитать весь файл, дополнить, переписать с indent=2"""
+    with open(path, 'r', encoding='utf-8') as f:
+        seen_ids = set(json.load(f).get('seen_ids', []))
+    before = len(seen_ids)
+    seen_ids.update(new_ids)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'seen_ids': list(seen_ids)}, f, ensure_ascii=False, indent=2)
+    return len(seen_ids) - before
+
+
+def main():
+    base_ids = make_ids(0, TOTAL_IDS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # Старый формат
+        old_file = tmp / "old_seen_ids.json"
+        with open(old_file, 'w', encoding='utf-8') as f:
+            json.dump({'seen_ids': base_ids}, f, indent=2)
+
+        start = time.perf_counter()
+        for n in range(BATCHES):
+            old_add_seen_ids(old_file, make_ids(TOTAL_IDS + n * BATCH, BATCH))
+        old_per_add = (time.perf_counter() - start) / BATCHES
+
+        # Журнал
+        store = SeenIdsStore(tmp / "seen_ids.json", tmp / "seen_ids.journal", compact_every=50_000)
+        store.replace(base_ids)
+
+        start = time.perf_counter()
+        store.load()
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for n in range(BATCHES):
+            store.add(make_ids(TOTAL_IDS + n * BATCH, BATCH))
+        new_per_add = (time.perf_counter() - start) / BATCHES
+
+        start = time.perf_counter()
+        for n in range(200):
+            _ = str(1012000000000 + n * 997) in store
+        lookup = (time.perf_counter() - start) / 200
+
+        start = time.perf_counter()
+        store.compact()
+        compact_time = time.perf_counter() - start
+
+        # Восстановление после «падения»: снапшот + непустой журнал
+        store.add(make_ids(TOTAL_IDS * 2, 10_000))
+        start = time.perf_counter()
+        recovered = SeenIdsStore(tmp / "seen_ids.json", tmp / "seen_ids.journal", compact_every=50_000)
+        recovered.load()
+        recover_time = time.perf_counter() - start
+        assert len(recovered) == len(store)
+
+    print(f"📦 {TOTAL_IDS:,} ID, добавление по {BATCH} ID")
+    print(f"   🐢 Старый add_seen_ids (перезапись JSON): {old_per_add * 1000:9.1f} мс")
+    print(f"   ⚡ Журнал SeenIdsStore.add:              {new_per_add * 1000:9.3f} мс  (x{old_per_add / new_per_add:.0f})")
+    print(f"   🔎 Проверка ID in store:                 {lookup * 1e6:9.2f} мкс")
+    print(f"   📂 Загрузка снапшота:                    {load_time * 1000:9.1f} мс")
+    print(f"   🗜️  Сжатие журнала в снапшот:             {compact_time * 1000:9.1f} мс")
+    print(f"   ♻️  Восстановление (снапшот + 10k журнал): {recover_time * 1000:9.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# benchmarks/bench_seen_index.py - seen_ids: set[str] из JSON vs mmap-индекс uint64
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from storage.seen_index import MmapSeenIndex
+
+TOTAL_IDS = 1_000_000
+LOOKUPS = 100_000
+
+
+def make_ids(count: int, seed: int = 1):
+    rnd = random.Random(seed)
+    return [str(1012000000000 + rnd.randint(0, 10 ** 10)) for _ in range(count)]
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, memory
+
+
+def lookup_time(container, probes):
+    start = time.perf_counter()
+    hits = sum(1 for p in probes if p in container)
+    return (time.perf_counter() - start) / len(probes), hits
+
+
+def main():
+    ids = make_ids(TOTAL_IDS)
+    probes = ids[:LOOKUPS // 2] + make_ids(LOOKUPS // 2, seed=2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        json_file = tmp / "seen_ids.json"
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump({'seen_ids': ids}, f)
+
+        index = MmapSeenIndex(tmp / "seen_ids.u64", tmp / "seen_ids.journal")
+        index.replace(ids)
+        del index
+
+        def load_set():
+            with open(json_file, 'r', encoding='utf-8') as f:
+                return set(json.load(f)['seen_ids'])
+
+        def load_index():
+            index = MmapSeenIndex(tmp / "seen_ids.u64", tmp / "seen_ids.journal", merge_every=10 ** 9)
+            index.load()
+            return index
+
+        seen_set, set_load, set_memory = measure(load_set)
+        index, index_load, index_memory = measure(load_index)
+
+        set_lookup, set_hits = lookup_time(seen_set, probes)
+        index_lookup, index_hits = lookup_time(index, probes)
+        assert set_hits == index_hits
+
+        new_ids = make_ids(50_000, seed=3)
+        index.add(new_ids)
+        start = time.perf_counter()
+        index.compact()
+        merge_time = time.perf_counter() - start
+        file_size = (tmp / "seen_ids.u64").stat().st_size
+
+    print(f"📦 {TOTAL_IDS:,} ID")
+    print(f"   {'':24} {'set[str] из JSON':>18} {'mmap uint64':>14}")
+    print(f"   {'Запуск (загрузка)':24} {set_load * 1000:15.1f} мс {index_load * 1000:11.2f} мс")
+    print(f"   {'Память Python':24} {set_memory / 2 ** 20:15.1f} МБ {index_memory / 2 ** 20:11.2f} МБ")
+    print(f"   {'Проверка ID':24} {set_lookup * 1e6:14.2f} мкс {index_lookup * 1e6:10.2f} мкс")
+    print(f"   🗜️  Слияние 50k дельты: {merge_time * 1000:.0f} мс, файл индекса: {file_size / 2 ** 20:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# benchmarks/bench_stream_parse.py - json.loads всего ответа vs потоковый разбор resultList
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from parsers.stream import ResultListStream
+from benchmarks.payloads import make_search_payload
+
+ROWS = 500
+CHUNK_SIZE = 64 * 1024
+STOP_AFTER = 20  # Watermark на 20-м элементе: типичная повторная проверка запроса
+REPEATS = 5
+
+
+def chunks(raw: bytes):
+    for i in range(0, len(raw), CHUNK_SIZE):
+        yield raw[i:i + CHUNK_SIZE]
+
+
+def full_decode(raw: bytes, stop_after: int = None):
+    """Старый путь: весь ответ в словари, затем перебор"""
+    first_item_at = None
+    start = time.perf_counter()
+    response = json.loads(b''.join(chunks(raw)))
+    for i, item in enumerate(response['data']['resultList']):
+        if first_item_at is None:
+            first_item_at = time.perf_counter() - start
+        if stop_after and i + 1 >= stop_after:
+            break
+    return first_item_at
+
+
+def stream_decode(raw: bytes, stop_after: int = None):
+    """Новый путь: элементы по мере чтения, остановка закрывает поток"""
+    first_item_at = None
+    start = time.perf_counter()
+    stream = ResultListStream.open(chunks(raw))
+    for i, item in enumerate(stream):
+        if first_item_at is None:
+            first_item_at = time.perf_counter() - start
+        if stop_after and i + 1 >= stop_after:
+            stream.close()
+            break
+    return first_item_at
+
+
+def measure(func, raw, stop_after):
+    best_total = best_first = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        first = func(raw, stop_after)
+        best_total = min(best_total, time.perf_counter() - start)
+        best_first = min(best_first, first)
+
+    tracemalloc.start()
+    func(raw, stop_after)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best_total, best_first, peak
+
+
+def main():
+    raw = json.dumps(make_search_payload(rows=ROWS), ensure_ascii=False).encode()
+    print(f"📦 Ответ: {ROWS} строк, {len(raw) / 1024:.0f} КБ, фрагменты по {CHUNK_SIZE // 1024} КБ")
+
+    for stop_after, label in ((None, "вся страница"), (STOP_AFTER, f"остановка на {STOP_AFTER}-м элементе")):
+        full_total, full_first, full_peak = measure(full_decode, raw, stop_after)
+        stream_total, stream_first, stream_peak = measure(stream_decode, raw, stop_after)
+
+        print(f"\n🔍 {label}:")
+        print(f"   🐢 json.loads:  всего {full_total * 1000:7.2f} мс, первый элемент {full_first * 1000:7.2f} мс, "
+              f"пик памяти {full_peak / 1024:7.0f} КБ")
+        print(f"   ⚡ Поток:       всего {stream_total * 1000:7.2f} мс, первый элемент {stream_first * 1000:7.2f} мс, "
+              f"пик памяти {stream_peak / 1024:7.0f} КБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# benchmarks/bench_title_matcher.py - сверка названий со всеми подписками: перебор vs Ахо-Корасик
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.matcher import TitleMatcher, normalize_pattern
+
+PATTERNS = 10000
+TITLES = 500
+REPEATS = 3
+
+WORDS = [
+    'stone', 'island', 'nike', 'air', 'force', 'jordan', 'adidas', 'yeezy', 'cav', 'empt',
+    'supreme', 'palace', 'arcteryx', 'beta', 'jacket', 'hoodie', 'vintage', 'iphone', 'pro',
+    'max', 'macbook', 'sony', 'walkman', 'leica', 'm6', '古着', '夹克', '卫衣', '复古', '限定',
+]
+
+
+def make_patterns(count: int, rng: random.Random):
+    """Запросы из 1-3 слов плюс числовой суффикс, чтобы набор был уникальным"""
+    patterns = set()
+    while len(patterns) < count:
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        if rng.random() < 0.7:
+            words.append(str(rng.randint(1, 999)))
+        patterns.add(' '.join(words))
+    return sorted(patterns)
+
+
+def make_titles(count: int, rng: random.Random):
+    return [
+        ' '.join(rng.choice(WORDS) if rng.random() < 0.8 else str(rng.randint(1, 999))
+                 for _ in range(rng.randint(6, 14)))
+        for _ in range(count)
+    ]
+
+
+def naive_match(patterns, titles):
+    """Текущая проверка filter_by_query, повторенная для каждой подписки"""
+    lowered = [(p, normalize_pattern(p)) for p in patterns]
+    results = []
+    for title in titles:
+        title = normalize_pattern(title)
+        results.append({p for p, key in lowered if key in title})
+    return results
+
+
+def bench(func, *args):
+    best = float('inf')
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    rng = random.Random(42)
+    patterns = make_patterns(PATTERNS, rng)
+    titles = make_titles(TITLES, rng)
+
+    start = time.perf_counter()
+    matcher = TitleMatcher(patterns)
+    build_time = time.perf_counter() - start
+
+    naive_time, naive_result = bench(naive_match, patterns, titles)
+    matcher_time, matcher_result = bench(matcher.match_many, titles)
+    assert naive_result == matcher_result
+
+    matches = sum(len(m) for m in matcher_result)
+    print(f"🔎 {PATTERNS} запросов × {TITLES} названий (совпадений: {matches})")
+    print(f"   🐢 Перебор подписок:   {naive_time * 1000:8.2f} мс")
+    print(f"   ⚡ Ахо-Корасик:         {matcher_time * 1000:8.2f} мс  (x{naive_time / matcher_time:.0f})")
+    print(f"   🏗️ Построение автомата: {build_time * 1000:8.2f} мс (при изменении подписок)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/payloads.py - синтетические ответы API Goofish для бенчмарков
+import random
+import time
+from typing import Dict
+
+
+def make_item(item_id: str, publish_ms: int, with_args: bool = True, title: str = None) -> Dict:
+    """Элемент resultList в формате mtop.taobao.idlemtopsearch.pc.search"""
+    title = title or f"stone island jacket {item_id[-4:]}"
+    ex_content = {
+        'itemId': item_id,
+        'area': '上海',
+        'picUrl': f"https://img.alicdn.com/{item_id}.jpg",
+        'detailParams': {'title': title},
+    }
+    main = {'exContent': ex_content}
+
+    if with_args:
+        main['clickParam'] = {
+            'args': {
+                'id': item_id,
+                'price': f"{random.randint(50, 5000)}.00",
+                'publishTime': str(publish_ms),
+                'area': '上海',
+                'picUrl': f"https://img.alicdn.com/{item_id}.jpg",
+                'detailParams': {'title': title},
+            }
+        }
+
+    return {'data': {'item': {'main': main}}}
+
+
+def make_search_payload(rows: int = 500, missing_args_ratio: float = 0.0,
+                        page: int = 1, step_seconds: int = 30, seed: int = 42) -> Dict:
+    """Страница выдачи, отсортированная по новизне
+
+    missing_args_ratio - доля элементов без clickParam.args: их данные
+    находятся только через перекрестную ссылку exContent.itemId на дубликат
+    с args в конце страницы (худший случай для линейного поиска).
+    """
+    rnd = random.Random(seed + page)
+    now_ms = int(time.time() * 1000)
+    first = (page - 1) * rows
+    result_list = []
+    tail = []
+
+    for i in range(rows):
+        item_id = str(1012000000000 + rnd.randint(0, 10 ** 9))
+        publish_ms = now_ms - (first + i) * step_seconds * 1000
+
+        if rnd.random() < missing_args_ratio:
+            result_list.append(make_item(item_id, publish_ms, with_args=False))
+            tail.append(make_item(item_id, publish_ms, with_args=True))
+        else:
+            result_list.append(make_item(item_id, publish_ms, with_args=True))
+
+    return {
+        'api': 'mtop.taobao.idlemtopsearch.pc.search',
+        'data': {'resultList': result_list + tail},
+        'ret': ['SUCCESS::调用成功'],
+        'v': '1.0',
+    }
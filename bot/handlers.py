@@ -14,13 +14,18 @@ from bot.parser_settings import (
 )
 from bot.whitelist import whitelist_manager, setup_whitelist_handlers  # Импорт whitelist
 from bot.personal_queries import setup_personal_handlers
-from storage.files import (
+from storage.backend import (
     load_search_queries, save_user, 
     get_user_queries
 )
-from parsers.goofish import GoofishParser
+from parsers.goofish import get_shared_parser
+from config import ROWS_PER_PAGE
+from utils.scheduler import LANE_INTERACTIVE, LANE_NAMES
 from utils.auto_refresh import cookies_manager  # Импорт менеджера cookies
 
+SEARCH_RESULTS_SHOWN = 3  # Товаров /search в одном сообщении
+SEARCH_HISTORY_SIZE = 10  # Сколько последних /search пользователя листаются кнопками
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обновленная команда /start с проверкой whitelist'а"""
     user = update.effective_user
@@ -108,43 +113,104 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = ' '.join(context.args)
     await update.message.reply_text(f"🔍 Ищу '{query}'...")
     
+    key = remember_search(context.user_data, query)
     try:
-        parser = GoofishParser()
-        products = parser.search(query, page=1, rows=20)
-        
-        if not products:
-            await update.message.reply_text("😔 Товары не найдены")
-            return
-        
-        # Отправляем первые 3 товара
-        for i, product in enumerate(products[:3], 1):
-            # Используем правильную валюту из настроек
-            currency = parser_settings.get('price_currency', 'yuan')
-            exchange_rate = parser_settings.get('yuan_to_rub_rate', 12.5)
-            
-            if currency == 'rubles':
-                price_text = f"💰 <b>{product.price_display_rub}</b> ({product.price_display})"
-            else:
-                price_text = f"💰 <b>{product.price_display}</b> (~{product.price_display_rub})"
-            
-            message = (
-                f"<b>{i}. {product.title[:80]}...</b>\n"
-                f"{price_text}\n"
-                f"📍 {product.location}\n"
-                f"⏰ {product.age_minutes} мин назад\n"
-                f"🔗 {product.url}"
-            )
-            await update.message.reply_text(message, parse_mode='HTML')
-        
-        if len(products) > 3:
-            await update.message.reply_text(
-                f"📊 Найдено товаров: {len(products)}\n"
-                f"Показаны первые 3."
-            )
-            
+        await send_search_results(update.message, key, query, page=1, start=0)
     except Exception as e:
         await update.message.reply_text(f"❌ Ошибка: {str(e)[:100]}")
 
+def remember_search(user_data: dict, query: str) -> int:
+    """Ключ запроса для кнопок листания (сам запрос в callback_data не помещается)
+
+    Хранятся последние SEARCH_HISTORY_SIZE запросов пользователя, так что
+    кнопки под более ранним /search листают свой запрос, а не последний.
+    """
+    searches = user_data.setdefault('searches', {})
+    key = user_data.get('search_seq', 0) + 1
+    user_data['search_seq'] = key
+    searches[key] = query
+    while len(searches) > SEARCH_HISTORY_SIZE:
+        del searches[next(iter(searches))]
+    return key
+
+async def send_search_results(message, key: int, query: str, page: int, start: int):
+    """Товары start..start+SEARCH_RESULTS_SHOWN страницы page и кнопки листания
+
+    Страница читается общим парсером через page_cache: повтор /search,
+    листание и проверка мониторинга того же запроса не обращаются к API.
+    Размер страницы - rows_per_page из настроек, как у мониторинга, чтобы
+    ключи кэша совпадали; уже виденные товары не отбрасываются, иначе
+    страницы сдвигались бы при листании.
+    """
+    parser = get_shared_parser()
+    rows = parser_settings.get('rows_per_page', ROWS_PER_PAGE)
+    # Интерактивная полоса: запрос обгоняет страницы мониторинга в очереди
+    products = await parser.search_async(query, page=page, rows=rows, only_new=False, lane=LANE_INTERACTIVE)
+    
+    if not products:
+        await message.reply_text("😔 Товары не найдены" if page == 1 else "😔 Больше товаров нет")
+        return
+    
+    # Используем правильную валюту из настроек
+    currency = parser_settings.get('price_currency', 'yuan')
+    shown = products[start:start + SEARCH_RESULTS_SHOWN]
+    for i, product in enumerate(shown, (page - 1) * rows + start + 1):
+        if currency == 'rubles':
+            price_text = f"💰 <b>{product.price_display_rub}</b> ({product.price_display})"
+        else:
+            price_text = f"💰 <b>{product.price_display}</b> (~{product.price_display_rub})"
+        
+        text = (
+            f"<b>{i}. {product.title[:80]}...</b>\n"
+            f"{price_text}\n"
+            f"📍 {product.location}\n"
+            f"⏰ {product.age_minutes} мин назад\n"
+            f"🔗 {product.url}"
+        )
+        await message.reply_text(text, parse_mode='HTML')
+    
+    # Кнопки: search:<ключ запроса>:<страница API>:<позиция на странице>
+    buttons = []
+    if start > 0:
+        buttons.append(InlineKeyboardButton(
+            "◀️ Назад", callback_data=f"search:{key}:{page}:{max(0, start - SEARCH_RESULTS_SHOWN)}"
+        ))
+    elif page > 1:
+        buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"search:{key}:{page - 1}:0"))
+    
+    if start + SEARCH_RESULTS_SHOWN < len(products):
+        buttons.append(InlineKeyboardButton(
+            "Дальше ▶️", callback_data=f"search:{key}:{page}:{start + SEARCH_RESULTS_SHOWN}"
+        ))
+    else:
+        buttons.append(InlineKeyboardButton("Дальше ▶️", callback_data=f"search:{key}:{page + 1}:0"))
+    
+    await message.reply_text(
+        f"📊 Страница {page}: товаров {len(products)}, "
+        f"показаны {start + 1}-{start + len(shown)}.",
+        reply_markup=InlineKeyboardMarkup([buttons])
+    )
+
+async def search_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Кнопки листания результатов /search"""
+    callback = update.callback_query
+    await callback.answer()
+    
+    parts = callback.data.split(':')
+    key = int(parts[1]) if len(parts) == 4 and parts[1].isdigit() else None
+    query = context.user_data.get('searches', {}).get(key)
+    if not query:
+        # Кнопки старого формата или запрос вытеснен более новыми
+        await callback.edit_message_text("⌛ Поиск устарел, повторите /search")
+        return
+    
+    try:
+        _, _, page, start = parts
+        await callback.edit_message_reply_markup(reply_markup=None)
+        await send_search_results(callback.message, key, query, page=int(page), start=int(start))
+    except Exception as e:
+        await callback.message.reply_text(f"❌ Ошибка: {str(e)[:100]}")
+
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Статус системы с информацией о пользователе"""
     bot = context.application.bot_data.get('bot_instance')
@@ -168,6 +234,30 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Циклов: {stats['cycles']}\n"
         f"Найдено товаров: {stats['total_products']}\n"
         f"Общих запросов: {len(global_queries)}\n"
+        f"Уникальных запросов в цикле: {stats.get('unique_queries', 0)} "
+        f"(сэкономлено проверок: {stats.get('saved_fetches', 0)}, "
+        f"вложением запросов: {stats.get('subsumed_fetches', 0)})\n"
+        f"Страниц за цикл: {stats.get('pages_fetched', 0)} "
+        f"(пропущено по возрасту: {stats.get('pages_saved', 0)})\n"
+        f"Темп запросов: {stats.get('request_rate', 0):.2f}/с "
+        f"(rate limit: {stats.get('rate_limited', 0)}, "
+        f"объединено одинаковых: {stats.get('deduplicated_requests', 0)})\n"
+        f"Кэш страниц: {stats.get('page_cache', {}).get('pages', 0)} "
+        f"(попаданий: {stats.get('page_cache', {}).get('hits', 0)}, "
+        f"промахов: {stats.get('page_cache', {}).get('misses', 0)})\n"
+        f"Запросов за час: {stats.get('budget', {}).get('used_last_hour', 0)}"
+        f"/{stats.get('budget', {}).get('max_per_hour', 0)}\n"
+    )
+    
+    # Ожидание в очереди запросов по полосам
+    for lane, wait in stats.get('queue_wait', {}).items():
+        if wait['requests']:
+            message += (
+                f"Очередь ({LANE_NAMES.get(lane, lane)}): "
+                f"ср. {wait['avg_wait']:.1f} с, макс. {wait['max_wait']:.1f} с\n"
+            )
+    
+    message += (
         f"<b>Ваших запросов: {len(user_queries)}</b>\n"
         f"Последняя проверка: {stats['last_check'] or 'никогда'}\n\n"
     )
@@ -270,6 +360,9 @@ def setup_handlers(application, bot_instance):
     # Регистрируем обработчики настроек
     application.add_handler(settings_conv_handler)
     
+    # Кнопки листания /search - до персональных запросов, у них общий CallbackQueryHandler
+    application.add_handler(CallbackQueryHandler(search_callback, pattern="^search:"))
+    
     # Регистрируем обработчики персональных запросов
     setup_personal_handlers(application)
     
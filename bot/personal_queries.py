@@ -1,7 +1,9 @@
 # bot/personal_queries.py
+import html
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler
-from storage.files import get_user_queries, save_user_queries, add_user_query, remove_user_query, load_search_queries
+from core.filters import compile_filter, FILTER_SYNTAX_HELP
+from storage.backend import get_user_queries, save_user_queries, add_user_query, remove_user_query, load_search_queries
 
 async def my_queries_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /myqueries - показать мои запросы"""
@@ -56,7 +58,9 @@ async def add_query_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "<b>Примеры:</b>\n"
             "/add iphone 15\n"
             "/add ноутбук asus\n"
-            "/add stone island\n\n"
+            "/add stone island\n"
+            "/add stone island +jacket -kids price:100-500 age:60\n\n"
+            f"⚙️ <b>Условия:</b>\n{FILTER_SYNTAX_HELP}\n\n"
             "📌 <i>Вы будете получать уведомления только по вашим запросам</i>",
             parse_mode='HTML'
         )
@@ -65,6 +69,15 @@ async def add_query_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = ' '.join(context.args)
     user_id = update.effective_user.id
     
+    try:
+        compile_filter(query)
+    except ValueError as e:
+        await update.message.reply_text(
+            f"❌ {html.escape(str(e))}\n\n⚙️ <b>Условия:</b>\n{FILTER_SYNTAX_HELP}",
+            parse_mode='HTML'
+        )
+        return
+    
     if add_user_query(user_id, query):
         await update.message.reply_text(
             f"✅ Запрос добавлен: <b>{query}</b>\n\n"
@@ -106,7 +119,7 @@ async def clear_queries_command(update: Update, context: ContextTypes.DEFAULT_TY
     """Команда /clear - очистить все запросы"""
     user_id = update.effective_user.id
     
-    from storage.files import clear_user_queries
+    from storage.backend import clear_user_queries
     if clear_user_queries(user_id):
         await update.message.reply_text(
             "🗑️ Все ваши запросы очищены.\n"
@@ -213,7 +226,7 @@ async def queries_callback_handler(update: Update, context: ContextTypes.DEFAULT
         )
     
     elif data == "confirm_clear":
-        from storage.files import clear_user_queries
+        from storage.backend import clear_user_queries
         clear_user_queries(user_id)
         
         await query.edit_message_text(
@@ -20,19 +20,49 @@ RESULTS_FILE = DATA_DIR / "results.txt"
 USERS_FILE = DATA_DIR / "users.json"
 SUBSCRIPTIONS_FILE = DATA_DIR / "subscriptions.json"
 SEEN_IDS_FILE = DATA_DIR / "seen_ids.json"
+SEEN_IDS_JOURNAL_FILE = DATA_DIR / "seen_ids.journal"  # Журнал добавлений к seen_ids.json
+SEEN_IDS_INDEX_FILE = DATA_DIR / "seen_ids.u64"  # Бинарный индекс для SEEN_IDS_BACKEND=mmap
 PARSER_SETTINGS_FILE = DATA_DIR / "parser_settings.json"  # Новый файл настроек
+WATERMARKS_FILE = DATA_DIR / "watermarks.json"  # Самые свежие товары по каждому запросу
+DB_FILE = DATA_DIR / "goofish.db"  # База SQLite для STORAGE_BACKEND=sqlite
 
 # Настройки парсера по умолчанию
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
+PARSER_MAX_WORKERS = 2  # Потоков для блокирующих запросов GoofishParser
+STREAM_CHUNK_SIZE = 64 * 1024  # Размер фрагмента при потоковом чтении resultList
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")  # auto (orjson, если установлен), orjson или json
+JSON_PRETTY = os.getenv("JSON_PRETTY", "0") == "1"  # Отступы в файлах data/ (по умолчанию компактно)
 DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 
+# Темп запросов к API (utils/rate_limiter.py, AIMD): растет на шаг после
+# каждого успеха, падает в RATE_DECREASE_FACTOR раз на RGV587_ERROR / 429
+RATE_LIMIT_FILE = DATA_DIR / "rate_limit.json"  # Найденный темп (переживает перезапуск)
+RATE_INITIAL_DELAY = 2.0  # Начальный интервал между запросами, сек
+REQUEST_DELAY_MIN = 0.5  # Минимальный интервал между запросами (потолок темпа), сек
+REQUEST_DELAY_MAX = 60.0  # Максимальный интервал (нижняя граница темпа), сек
+RATE_INCREASE_STEP = 0.01  # Прибавка к темпу после успешного ответа, запр/с
+RATE_DECREASE_FACTOR = 0.5  # Множитель темпа при rate limit
+RATE_LIMIT_DELAY = 30  # Пауза всех запросов после rate limit, сек
+RATE_SAVE_INTERVAL = 60  # Как часто сохранять темп при росте, сек
+MAX_REQUESTS_PER_HOUR = int(os.getenv("MAX_REQUESTS_PER_HOUR", "3600"))  # Часовой бюджет (utils/budget.py)
+BUDGET_LOW_SHARE = 0.25  # Доля свободного бюджета, ниже которой обход запросов становится мельче
+SEARCH_CACHE_TTL = 15  # Сколько секунд страница выдачи отдается из кэша (не больше половины интервала проверки)
+SEARCH_CACHE_MAX_PAGES = 64  # Страниц в кэше, сверх - вытесняются давно не читанные
+
 # Настройки мониторинга (будут переопределяться из файла настроек)
 CHECK_INTERVAL = 20
 MAX_AGE_MINUTES = 1440
 MAX_PAGES = 50
 ROWS_PER_PAGE = 500
 DEFAULT_QUERIES = ["cav"]
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "files")  # files (JSON) или sqlite (data/goofish.db)
+SEEN_IDS_BACKEND = os.getenv("SEEN_IDS_BACKEND", "journal")  # journal (JSON + журнал) или mmap (uint64)
+SEEN_IDS_COMPACT_EVERY = 10000  # Записей в журнале seen_ids до сжатия в снапшот
+SEEN_IDS_MERGE_EVERY = 50000  # Размер дельты mmap-индекса до слияния с файлом
+SEEN_IDS_RETENTION_MINUTES = 2 * MAX_AGE_MINUTES  # Сколько помнить ID (не меньше макс. возраста товара)
+WATERMARK_GRACE_ITEMS = 3  # Сколько товаров подряд старше watermark нужно для остановки
+SUBSUMPTION_PAGES_FACTOR = 3  # Во сколько раз больше страниц может пройти запрос, покрывающий другие
 
 ROLE_ADMIN = "admin"
 ROLE_USER = "user"
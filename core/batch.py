@@ -0,0 +1,206 @@
+# core/batch.py - страница товаров в колоночном виде (NumPy) для векторных фильтров
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from models import Product
+
+MAX_UINT64 = 2 ** 64 - 1
+
+
+class ProductBatch:
+    """Товары страницы как набор колонок вместо списка Product
+
+    Числовые колонки (ID, цена, возраст, время публикации) хранятся в
+    массивах NumPy, местоположение и запрос - кодами в таблицах строк.
+    Фильтры по возрасту, цене и просмотренным ID считаются масками над
+    всей страницей, а объекты Product создаются только для оставшихся
+    товаров (to_products).
+    """
+
+    def __init__(self, ids: List[str], titles: List[str], prices, ages, publish_ms,
+                 location_codes, locations: List[str], query_codes, queries: List[str],
+                 images: List[List[str]]):
+        self.ids = ids
+        self.titles = titles
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.ages = np.asarray(ages, dtype=np.float64)
+        self.publish_ms = np.asarray(publish_ms, dtype=np.int64)
+        self.location_codes = np.asarray(location_codes, dtype=np.int32)
+        self.locations = locations
+        self.query_codes = np.asarray(query_codes, dtype=np.int32)
+        self.queries = queries
+        self.images = images
+
+        # ID Goofish числовые: храним их и как uint64 для векторной проверки seen_ids
+        try:
+            self.numeric_ids = np.array(ids, dtype=np.str_).astype(np.uint64)
+            self.is_numeric = np.ones(len(ids), dtype=bool)
+        except (ValueError, OverflowError):
+            self.numeric_ids = np.zeros(len(ids), dtype=np.uint64)
+            self.is_numeric = np.zeros(len(ids), dtype=bool)
+            for i, item_id in enumerate(ids):
+                if item_id.isdigit() and int(item_id) <= MAX_UINT64:
+                    self.numeric_ids[i] = int(item_id)
+                    self.is_numeric[i] = True
+
+    @classmethod
+    def empty(cls) -> 'ProductBatch':
+        return ProductBatchBuilder().build()
+
+    @classmethod
+    def projection(cls, ids: List[str], ages, publish_ms) -> 'ProductBatch':
+        """Партия только из ID и времени - для фильтров до полного разбора товаров"""
+        count = len(ids)
+        return cls(
+            ids=ids,
+            titles=[''] * count,
+            prices=np.zeros(count),
+            ages=ages,
+            publish_ms=publish_ms,
+            location_codes=np.zeros(count, dtype=np.int32),
+            locations=[''],
+            query_codes=np.zeros(count, dtype=np.int32),
+            queries=[''],
+            images=[None] * count,
+        )
+
+    @classmethod
+    def from_products(cls, products: Iterable[Product]) -> 'ProductBatch':
+        builder = ProductBatchBuilder()
+        for p in products:
+            builder.append(p.id, p.title, p.price, p.location, p.age_minutes, p.query, p.images)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------- Маски ----------
+
+    def age_mask(self, max_age_minutes: float) -> np.ndarray:
+        return self.ages <= max_age_minutes
+
+    def price_mask(self, price_min: Optional[float] = None, price_max: Optional[float] = None) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        if price_min is not None:
+            mask &= self.prices >= price_min
+        if price_max is not None:
+            mask &= self.prices <= price_max
+        return mask
+
+    def seen_mask(self, seen_ids) -> np.ndarray:
+        """Маска уже просмотренных товаров
+
+        Если хранилище умеет проверять массив uint64 целиком (MmapSeenIndex),
+        проверка векторная; иначе - поштучно через `in`.
+        """
+        contains_array = getattr(seen_ids, 'contains_array', None)
+        if contains_array is None:
+            return np.fromiter((item_id in seen_ids for item_id in self.ids), dtype=bool, count=len(self))
+
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.is_numeric] = contains_array(self.numeric_ids[self.is_numeric])
+        for i in np.flatnonzero(~self.is_numeric):
+            mask[i] = self.ids[i] in seen_ids
+        return mask
+
+    def location_mask(self, text: str, key: Callable[[str], str] = None) -> np.ndarray:
+        """Местоположение (приведенное key) содержит text - проверка один раз на уникальное значение"""
+        matching = np.array([text in (key(loc) if key else loc) for loc in self.locations], dtype=bool)
+        if not len(matching):
+            return np.zeros(len(self), dtype=bool)
+        return matching[self.location_codes]
+
+    def title_keys(self, key: Callable[[str], str]) -> List[str]:
+        """Названия, приведенные key; считаются один раз на партию для всех фильтров"""
+        cache = self.__dict__.setdefault('_title_keys', {})
+        if key not in cache:
+            cache[key] = [key(title) for title in self.titles]
+        return cache[key]
+
+    # ---------- Выборка ----------
+
+    def select(self, mask: np.ndarray) -> 'ProductBatch':
+        """Новая партия из строк, отмеченных маской"""
+        rows = np.flatnonzero(mask)
+        batch = object.__new__(ProductBatch)
+        batch.ids = [self.ids[i] for i in rows]
+        batch.titles = [self.titles[i] for i in rows]
+        batch.images = [self.images[i] for i in rows]
+        batch.prices = self.prices[rows]
+        batch.ages = self.ages[rows]
+        batch.publish_ms = self.publish_ms[rows]
+        batch.location_codes = self.location_codes[rows]
+        batch.locations = self.locations
+        batch.query_codes = self.query_codes[rows]
+        batch.queries = self.queries
+        batch.numeric_ids = self.numeric_ids[rows]
+        batch.is_numeric = self.is_numeric[rows]
+        return batch
+
+    def to_products(self) -> List[Product]:
+        """Объекты Product для всех строк партии"""
+        prices = self.prices.tolist()
+        ages = self.ages.tolist()
+        location_codes = self.location_codes.tolist()
+        query_codes = self.query_codes.tolist()
+        return [
+            Product(
+                id=self.ids[i],
+                title=self.titles[i],
+                price=prices[i],
+                url=f"https://www.goofish.com/item?id={self.ids[i]}",
+                location=self.locations[location_codes[i]],
+                age_minutes=round(ages[i], 1),
+                query=self.queries[query_codes[i]],
+                images=self.images[i]
+            )
+            for i in range(len(self))
+        ]
+
+
+class ProductBatchBuilder:
+    """Накопление строк страницы перед созданием ProductBatch
+
+    Строки копятся кортежами и раскладываются по колонкам один раз в build().
+    """
+
+    def __init__(self):
+        self._rows: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def append(self, item_id: str, title: str, price: float, location: str, age_minutes: float,
+               query: str, images: List[str] = None, publish_ms: int = 0):
+        self._rows.append((str(item_id), title, price, location or '', age_minutes,
+                           query or '', images or [], publish_ms or 0))
+
+    @staticmethod
+    def _intern(values) -> tuple:
+        """Коды значений и таблица уникальных значений"""
+        table: Dict[str, int] = {}
+        codes = [table.setdefault(value, len(table)) for value in values]
+        return codes, list(table)
+
+    def build(self) -> ProductBatch:
+        if not self._rows:
+            ids = titles = prices = locations = ages = queries = images = publish_ms = ()
+        else:
+            ids, titles, prices, locations, ages, queries, images, publish_ms = zip(*self._rows)
+
+        location_codes, location_table = self._intern(locations)
+        query_codes, query_table = self._intern(queries)
+
+        return ProductBatch(
+            ids=list(ids),
+            titles=list(titles),
+            prices=prices,
+            ages=ages,
+            publish_ms=publish_ms,
+            location_codes=location_codes,
+            locations=location_table,
+            query_codes=query_codes,
+            queries=query_table,
+            images=list(images),
+        )
@@ -0,0 +1,136 @@
+# core/filters.py - язык выражений подписок, компилируемый в проверку страницы товаров
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from core.batch import ProductBatch
+from core.normalize import normalize_text
+from models import Product
+
+# Синтаксис подписки (слова без префикса - текст поиска):
+#   stone island +jacket -kids price:100-500 loc:上海 age:60
+#   +слово         - обязательное слово в названии
+#   -слово         - исключающее слово
+#   price:100-500  - цена в юанях (также price:>100, price:<500, price:100-)
+#   loc:текст      - местоположение содержит текст (также location:)
+#   age:60         - товар не старше N минут
+_PRICE_RE = re.compile(r'^(?:(?P<op>[<>])(?P<bound>\d+(?:\.\d+)?)|(?P<min>\d+(?:\.\d+)?)?-(?P<max>\d+(?:\.\d+)?)?)$')
+
+FILTER_SYNTAX_HELP = (
+    "+слово - обязательное слово, -слово - исключить слово,\n"
+    "price:100-500 - цена в ¥, loc:город - местоположение, age:60 - не старше N мин"
+)
+
+
+@dataclass(frozen=True)
+class SubscriptionFilter:
+    """Скомпилированное выражение подписки"""
+    expression: str
+    search_query: str  # Текст, по которому выполняется поиск на Goofish
+    required: Tuple[str, ...] = ()
+    excluded: Tuple[str, ...] = ()
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    location: Optional[str] = None
+    max_age_minutes: Optional[float] = None
+
+    @property
+    def is_plain(self) -> bool:
+        """Выражение - просто текст поиска без дополнительных условий"""
+        return not (self.required or self.excluded or self.location
+                    or self.price_min is not None or self.price_max is not None
+                    or self.max_age_minutes is not None)
+
+    def mask(self, batch: ProductBatch) -> np.ndarray:
+        """Маска товаров страницы, проходящих фильтр
+
+        Возраст и цена - сравнения над колонками NumPy, местоположение -
+        проверка по таблице уникальных значений. Слова в названии (поиск
+        подстрок) проверяются последними и только для оставшихся строк.
+        """
+        mask = np.ones(len(batch), dtype=bool)
+        if self.max_age_minutes is not None:
+            mask &= batch.age_mask(self.max_age_minutes)
+        if self.price_min is not None or self.price_max is not None:
+            mask &= batch.price_mask(self.price_min, self.price_max)
+        if self.location:
+            mask &= batch.location_mask(self.location, key=normalize_text)
+
+        if (self.required or self.excluded) and mask.any():
+            titles = batch.title_keys(normalize_text)
+            for i in np.flatnonzero(mask):
+                title = titles[i]
+                mask[i] = (all(word in title for word in self.required)
+                           and not any(word in title for word in self.excluded))
+        return mask
+
+    def apply(self, products: List[Product], batch: ProductBatch = None) -> List[Product]:
+        """Отбор товаров страницы; batch - те же товары в колонках (строится один раз на страницу)"""
+        if self.is_plain or not products:
+            return list(products)
+        if batch is None:
+            batch = ProductBatch.from_products(products)
+        return [products[i] for i in np.flatnonzero(self.mask(batch))]
+
+
+def _parse_price(value: str, expression: str) -> Tuple[Optional[float], Optional[float]]:
+    match = _PRICE_RE.match(value)
+    if not match:
+        raise ValueError(f"Некорректная цена '{value}' в подписке '{expression}'")
+    if match.group('op') == '>':
+        return float(match.group('bound')), None
+    if match.group('op') == '<':
+        return None, float(match.group('bound'))
+    price_min = float(match.group('min')) if match.group('min') else None
+    price_max = float(match.group('max')) if match.group('max') else None
+    return price_min, price_max
+
+
+@lru_cache(maxsize=4096)
+def compile_filter(expression: str) -> SubscriptionFilter:
+    """Разбор выражения подписки в фильтр (один раз на выражение)
+
+    Вхождение текста поиска в название здесь не проверяется: его уже
+    проверяют filter_by_query в парсере и TitleMatcher при рассылке.
+    ValueError - если выражение некорректно или в нем нет текста поиска.
+    """
+    words, required, excluded = [], [], []
+    price_min = price_max = location = max_age = None
+
+    for token in expression.split():
+        key, sep, value = token.partition(':')
+        key = key.lower()
+
+        if sep and value and key == 'price':
+            price_min, price_max = _parse_price(value, expression)
+        elif sep and value and key in ('loc', 'location'):
+            location = normalize_text(value)
+        elif sep and value and key == 'age':
+            try:
+                max_age = float(value)
+            except ValueError:
+                raise ValueError(f"Некорректный возраст '{value}' в подписке '{expression}'")
+        elif len(token) > 1 and token[0] == '+':
+            required.append(normalize_text(token[1:]))
+        elif len(token) > 1 and token[0] == '-':
+            excluded.append(normalize_text(token[1:]))
+        else:
+            words.append(token)
+
+    search_query = ' '.join(words)
+    if not search_query:
+        raise ValueError(f"В подписке '{expression}' нет текста для поиска")
+
+    return SubscriptionFilter(
+        expression=expression,
+        search_query=search_query,
+        required=tuple(required),
+        excluded=tuple(excluded),
+        price_min=price_min,
+        price_max=price_max,
+        location=location,
+        max_age_minutes=max_age,
+    )
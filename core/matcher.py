@@ -0,0 +1,119 @@
+# core/matcher.py - поиск всех подписок, входящих в название товара, за один проход
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+from core.normalize import normalize_text
+
+
+def normalize_pattern(text: str) -> str:
+    """Приведение запроса и названия к общему виду перед сравнением"""
+    return normalize_text(text)
+
+
+class TitleMatcher:
+    """Автомат Ахо-Корасик по набору запросов
+
+    Строится один раз по всем запросам подписок; match() проходит название
+    товара один раз и возвращает все запросы, которые входят в него
+    подстрокой (та же проверка, что filter_by_query, но для всех подписок
+    сразу). Время match() не зависит от числа запросов - только от длины
+    названия и числа совпадений.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]  # Совпадения узла, включая совпадения по fail-ссылкам
+        self._keys: List[str] = []  # Нормализованный запрос -> исходные написания
+        self._originals: List[List[str]] = []
+
+        key_ids: Dict[str, int] = {}
+        for pattern in patterns:
+            key = normalize_pattern(pattern)
+            if not key:
+                continue
+            if key not in key_ids:
+                key_ids[key] = len(self._keys)
+                self._keys.append(key)
+                self._originals.append([])
+                self._insert(key, key_ids[key])
+            if pattern not in self._originals[key_ids[key]]:
+                self._originals[key_ids[key]].append(pattern)
+
+        self._build_links()
+
+    def _insert(self, key: str, key_id: int):
+        node = 0
+        for char in key:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(key_id)
+
+    def _build_links(self):
+        """Fail-ссылки обходом в ширину"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                link = goto[state].get(char, 0)
+                fail[child] = link if link != child else 0
+                if out[fail[child]]:
+                    out[child] = out[child] + out[fail[child]]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def match_keys(self, title: str) -> Set[int]:
+        """Номера нормализованных запросов, входящих в название"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        node = 0
+
+        for char in normalize_pattern(title):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+
+        return found
+
+    def match(self, title: str) -> Set[str]:
+        """Все запросы (в исходном написании), входящие в название"""
+        matched: Set[str] = set()
+        for key_id in self.match_keys(title):
+            matched.update(self._originals[key_id])
+        return matched
+
+    def match_many(self, titles: Iterable[str]) -> List[Set[str]]:
+        """Совпадения для страницы названий"""
+        return [self.match(title) for title in titles]
+
+
+class MatcherCache:
+    """Автомат, перестраиваемый только при изменении набора запросов"""
+
+    def __init__(self):
+        self._patterns: frozenset = frozenset()
+        self._matcher = TitleMatcher(())
+        self.rebuilds = 0
+
+    def get(self, patterns: Iterable[str]) -> TitleMatcher:
+        patterns = frozenset(patterns)
+        if patterns != self._patterns:
+            self._matcher = TitleMatcher(patterns)
+            self._patterns = patterns
+            self.rebuilds += 1
+        return self._matcher
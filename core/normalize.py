@@ -0,0 +1,53 @@
+# core/normalize.py - канонический вид запросов и названий для сравнения
+import re
+import unicodedata
+from functools import lru_cache
+
+try:
+    from opencc import OpenCC
+    _t2s = OpenCC('t2s').convert
+    OPENCC_AVAILABLE = True
+except ImportError:
+    # Без opencc - небольшая таблица иероглифов, частых в названиях товаров
+    OPENCC_AVAILABLE = False
+    _TRADITIONAL = (
+        '蘋機錶褲襯裝飾極緻運動與專業戶這個們來時間問題關學電腦視頻無線藍紅綠黃長發'
+        '張門開車東區華價錢貨買賣質號廣體寶貝復繡絲綢邊實際經標誌聯網條鏈傘隻雙頭髮'
+    )
+    _SIMPLIFIED = (
+        '苹机表裤衬装饰极致运动与专业户这个们来时间问题关学电脑视频无线蓝红绿黄长发'
+        '张门开车东区华价钱货买卖质号广体宝贝复绣丝绸边实际经标志联网条链伞只双头发'
+    )
+    _T2S_TABLE = str.maketrans(_TRADITIONAL, _SIMPLIFIED)
+
+    def _t2s(text: str) -> str:
+        return text.translate(_T2S_TABLE)
+
+_SPACES_RE = re.compile(r'\s+')
+# Граница буквы и цифры: «iphone15» и «iphone 15» - один запрос
+_LETTER_DIGIT_RE = re.compile(r'(?<=[^\W\d_])(?=\d)|(?<=\d)(?=[^\W\d_])')
+
+
+def normalize_text(text: str) -> str:
+    """Канонический вид строки для сравнения подстрокой
+
+    NFKC (полноширинные «ｉｐｈｏｎｅ» → «iphone», совместимые символы),
+    регистр, традиционные иероглифы → упрощенные и схлопывание пробелов.
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _t2s(text)
+    return _SPACES_RE.sub(' ', text).strip()
+
+
+@lru_cache(maxsize=8192)
+def canonical_query(query: str) -> str:
+    """Ключ запроса: разные написания одного запроса дают один ключ
+
+    Только для дедупликации запросов к API (и ключа watermark): здесь
+    дополнительно разделяются буквы и цифры, «iphone15» и «iphone 15» -
+    один ключ. Названия сравниваются с запросом по normalize_text, без
+    разделения, иначе «ps 5» находилось бы в «caps 5 pieces».
+    """
+    return _SPACES_RE.sub(' ', _LETTER_DIGIT_RE.sub(' ', normalize_text(query))).strip()
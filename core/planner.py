@@ -0,0 +1,146 @@
+# core/planner.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from core.filters import compile_filter
+from core.matcher import TitleMatcher, normalize_pattern
+from core.normalize import canonical_query
+from storage.subscription_index import SubscriptionIndex
+
+
+@dataclass
+class CyclePlan:
+    """План цикла мониторинга: уникальные запросы и поиск их получателей
+
+    Подписчики не копируются в план: recipients() берет их из обратного
+    индекса подписок в момент рассылки, за O(получателей запроса).
+    """
+    index: Optional[SubscriptionIndex] = None
+    user_ids: Set[int] = field(default_factory=set)
+    global_queries: Set[str] = field(default_factory=set)  # Получают все пользователи
+    expressions: List[str] = field(default_factory=list)  # Выражения подписок в порядке появления
+    # Текст поиска -> выражения подписок с этим текстом (один запрос к API на группу)
+    fetch_groups: Dict[str, List[str]] = field(default_factory=dict)
+    naive_fetches: int = 0  # Сколько проверок запросов было бы без дедупликации
+    # Узкий текст поиска -> покрывающий его запрос (узкий запрос не запрашивается)
+    covered_by: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def queries(self) -> List[str]:
+        """Уникальные тексты поиска в порядке первого появления"""
+        return list(self.fetch_groups)
+
+    @property
+    def saved_fetches(self) -> int:
+        """Сколько проверок запросов сэкономлено дедупликацией"""
+        return max(self.naive_fetches - len(self.fetch_groups), 0)
+
+    @property
+    def fetch_queries(self) -> List[str]:
+        """Тексты поиска, которые действительно запрашиваются у API"""
+        return [q for q in self.fetch_groups if q not in self.covered_by]
+
+    @property
+    def subsumed_fetches(self) -> int:
+        """Сколько запросов к API сэкономлено вложением запросов"""
+        return len(self.covered_by)
+
+    def covered_queries(self, query: str) -> List[str]:
+        """Узкие запросы, результаты которых берутся из выдачи query"""
+        return [narrow for narrow, cover in self.covered_by.items() if cover == query]
+
+    def group_fetches(self):
+        """Группировка выражений подписок по каноническому ключу текста поиска
+
+        «iPhone 15», «iphone15» и «ｉｐｈｏｎｅ 15» - один запрос к API; он
+        выполняется с написанием, встретившимся первым, а пользователи видят
+        в уведомлениях свое написание.
+        """
+        self.fetch_groups = {}
+        representatives = {}  # Канонический ключ -> текст, с которым идет запрос
+        for expression in list(self.expressions):
+            try:
+                search_query = compile_filter(expression).search_query
+            except ValueError as e:
+                print(f"⚠️ Подписка пропущена: {e}")
+                self.expressions.remove(expression)
+                continue
+            fetch_query = representatives.setdefault(canonical_query(search_query), search_query)
+            self.fetch_groups.setdefault(fetch_query, []).append(expression)
+
+    def recipients(self, expression: str) -> Set[int]:
+        """Пользователи, которым отправляются товары подписки expression"""
+        if expression in self.global_queries:
+            return set(self.user_ids)
+        if self.index is None:
+            return set()
+        return self.index.subscribers(expression) & self.user_ids
+
+
+def build_cycle_plan(users: Dict, index: SubscriptionIndex, global_queries: List[str]) -> CyclePlan:
+    """Построение плана: каждый уникальный запрос проверяется один раз за цикл
+
+    Запросы берутся из ключей обратного индекса подписок (O(уникальных
+    запросов), без обхода списков запросов каждого пользователя), получатели -
+    из него же при рассылке (CyclePlan.recipients). Общие запросы получают
+    все пользователи: и как запросы по умолчанию (как в get_user_queries), и
+    как рассылка для всех.
+    """
+    plan = CyclePlan(index=index)
+
+    for user_id_str in users:
+        try:
+            plan.user_ids.add(int(user_id_str))
+        except (TypeError, ValueError):
+            print(f"⚠️ Некорректный ID пользователя: {user_id_str}")
+
+    for query in index.queries():
+        # Подписки пользователей, которых нет в users, не запрашиваются
+        if index.has_subscribers_among(query, plan.user_ids):
+            plan.expressions.append(query)
+            plan.naive_fetches += index.subscriber_count(query)
+
+    # Общие запросы получают все пользователи
+    global_queries = [q for q in global_queries if q]
+    plan.global_queries = set(global_queries)
+    without_personal = len(plan.user_ids - index.personal_users)
+    plan.naive_fetches += len(global_queries) * (without_personal + 1)
+    for query in global_queries:
+        if query not in plan.expressions:
+            plan.expressions.append(query)
+
+    plan.group_fetches()
+    return plan
+
+
+def apply_subsumption(plan: CyclePlan) -> CyclePlan:
+    """Вложение запросов: «stone island» покрывает «stone island jacket»
+
+    При filter_by_query узкий запрос возвращает только товары, в названии
+    которых есть его текст, а значит и текст более короткого запроса, так
+    что выдача узкого запроса содержится в выдаче покрывающего. Узкий
+    запрос не запрашивается: его подписчики получают товары покрывающего
+    через TitleMatcher. Покрывающим выбирается самый длинный из запросов,
+    не покрытых никем (меньше лишних товаров).
+    """
+    queries = list(plan.fetch_groups)
+    order = {query: i for i, query in enumerate(queries)}
+    matcher = TitleMatcher(queries)
+
+    covers: Dict[str, Set[str]] = {}
+    for query in queries:
+        key = normalize_pattern(query)
+        # Одинаковые после нормализации запросы покрывают друг друга - берем первый
+        covers[query] = {
+            other for other in matcher.match(query)
+            if other != query and (normalize_pattern(other) != key or order[other] < order[query])
+        }
+
+    roots = {query for query in queries if not covers[query]}
+    plan.covered_by = {}
+    for query in queries:
+        candidates = covers[query] & roots
+        if candidates:
+            plan.covered_by[query] = max(candidates, key=lambda q: (len(normalize_pattern(q)), -order[q]))
+
+    return plan
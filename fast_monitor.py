@@ -1,6 +1,6 @@
 import asyncio
 from parsers.async_goofish import AsyncGoofishParser
-from storage.files import load_search_queries, add_seen_ids
+from storage.backend import load_search_queries, add_seen_ids
 
 class FastMonitor:
     def __init__(self):
@@ -8,12 +8,25 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
 from telegram.ext import Application
-from config import BOT_TOKEN
+from config import BOT_TOKEN, SEEN_IDS_RETENTION_MINUTES, SUBSUMPTION_PAGES_FACTOR
 from bot.handlers import setup_handlers
 from bot.notifications import send_new_products
-from parsers.goofish import GoofishParser
-from storage.files import load_search_queries, add_seen_ids, load_seen_ids, get_user_queries
+from parsers.goofish import get_shared_parser, search_flight
+from parsers.result_cache import page_cache
+from storage.backend import (
+    load_search_queries, add_seen_ids, load_users, load_subscription_index,
+    get_query_watermark, save_query_watermark, watermark_batch, seen_ids_store
+)
+from core.planner import build_cycle_plan, apply_subsumption
+from core.matcher import MatcherCache
+from core.batch import ProductBatch
+from core.filters import compile_filter
+from core.normalize import canonical_query
+from bot.parser_settings import parser_settings
 from utils.auto_refresh import cookies_manager  # Импорт менеджера cookies
+from utils.rate_limiter import rate_limiter
+from utils.budget import request_budget
+from utils.scheduler import request_scheduler
 
 # Создаем core/settings.py если его нет
 try:
@@ -40,6 +53,9 @@ class SimpleMonitor:
         self.cycles = 0
         self.total_products = 0
         self.last_check = None
+        self.last_plan = None
+        self.matcher_cache = MatcherCache()  # Автомат по запросам подписок
+        self.cycle_stats = {'pages_fetched': 0, 'pages_saved': 0, 'watermark_stops': 0}
         self.parser = None
         
         # Используем настройки
@@ -58,7 +74,7 @@ class SimpleMonitor:
         # Инициализируем менеджер cookies
         await cookies_manager.initialize()
         
-        self.parser = GoofishParser()
+        self.parser = get_shared_parser()
         
         # Проверяем cookies
         is_valid, message = self.parser.check_cookies()
@@ -84,6 +100,10 @@ class SimpleMonitor:
         
         while self.is_running:
             try:
+                # Подхватывает cookies, обновленные cookies_manager'ом
+                self.parser = get_shared_parser()
+                # Страница прошлого цикла не должна дожить в кэше до этого
+                page_cache.limit_ttl(self.settings.check_interval)
                 await self.check_all_users_queries()
                 self.cycles += 1
                 
@@ -101,143 +121,215 @@ class SimpleMonitor:
                 await asyncio.sleep(60)
     
     async def check_all_users_queries(self):
-        """Проверка запросов всех пользователей"""
-        from storage.files import load_users, load_subscriptions
-        
+        """Проверка запросов всех пользователей: каждый уникальный запрос - один раз за цикл"""
         users = load_users()
-        subscriptions = load_subscriptions()
+        subscription_index = load_subscription_index()
+        global_queries = load_search_queries()
         
         if not users:
             print("📭 Нет пользователей для мониторинга")
             return
         
-        print(f"👥 Проверяю запросы {len(users)} пользователей...")
+        # ID нельзя забывать раньше, чем товар перестанет проходить фильтр по возрасту
+        seen_ids_store.retention_minutes = max(
+            SEEN_IDS_RETENTION_MINUTES, 2 * int(self.settings.max_age_minutes)
+        )
+        
+        plan = build_cycle_plan(users, subscription_index, global_queries)
+        self.last_plan = plan
+        self.cycle_stats = {'pages_fetched': 0, 'pages_saved': 0, 'watermark_stops': 0}
+        
+        print(f"👥 Проверяю запросы {len(users)} пользователей: "
+              f"{len(plan.fetch_groups)} уникальных запросов "
+              f"(сэкономлено проверок: {plan.saved_fetches})")
         
         total_found = 0
         
-        for user_id_str in users:
-            try:
-                user_id = int(user_id_str)
-                user_queries = get_user_queries(user_id)
-                
-                if not user_queries:
+        # Страница одного запроса сверяется со всеми подписками сразу: товар
+        # уходит каждому, чей текст поиска входит в название (как filter_by_query).
+        # Иначе товар, увиденный под другим запросом, попадет в seen_ids и
+        # подписчики более узкого запроса его не получат
+        cross_match = parser_settings.get('filter_by_query', True)
+        matcher = self.matcher_cache.get(plan.fetch_groups) if cross_match else None
+        delivered = {}  # user_id -> ID товаров, уже отправленных в этом цикле
+        
+        # Узкие запросы, покрытые более широкими, не запрашиваются (только при filter_by_query)
+        if cross_match:
+            apply_subsumption(plan)
+        
+        # Сдвиги watermark всех запросов цикла - одна запись на диск в конце
+        with watermark_batch():
+            pending = list(plan.fetch_queries)
+            while pending:
+                query = pending.pop(0)
+                covered = plan.covered_queries(query)
+                max_pages = None
+                if covered:
+                    # Широкий запрос проходит глубже: его выдача содержит и выдачу узких
+                    max_pages = int(self.settings.max_pages) * min(len(covered) + 1, SUBSUMPTION_PAGES_FACTOR)
+                    print(f"  🧩 '{query}' покрывает: {', '.join(covered)}")
+            
+                try:
+                    new_products, window_covered = await self.fetch_query(query, max_pages)
+                except Exception as e:
+                    print(f"  ❌ Ошибка при проверке запроса '{query}': {e}")
+                    new_products, window_covered = [], False
+            
+                if covered and not window_covered:
+                    # Окно по возрасту не пройдено - узкие запросы проверяем сами
+                    print(f"  ↩️ Выдача '{query}' пройдена не полностью, проверяю узкие запросы отдельно")
+                    for narrow in covered:
+                        del plan.covered_by[narrow]
+                    pending[:0] = covered
+            
+                if not new_products:
                     continue
-                
-                print(f"  👤 Пользователь {user_id}: {len(user_queries)} запросов")
-                
-                found_products = []
-                for query in user_queries:
-                    try:
-                        new_products = await self.check_query(query)
-                        if new_products:
-                            found_products.extend(new_products)
-                    except Exception as e:
-                        print(f"  ❌ Ошибка при проверке запроса '{query}' у пользователя {user_id}: {e}")
-                
-                # Отправляем товары пользователю
-                if found_products and self.bot:
-                    # Группируем по запросу
-                    products_by_query = {}
-                    for product in found_products:
-                        if product.query not in products_by_query:
-                            products_by_query[product.query] = []
-                        products_by_query[product.query].append(product)
-                    
-                    # Отправляем уведомления для каждого запроса
-                    for query, products in products_by_query.items():
-                        await self.bot.send_user_new_products(user_id, products, query)
-                    
-                    total_found += len(found_products)
+            
+                total_found += len(new_products)
+            
+                # Группировка товаров по текстам поиска, в которые они попадают
+                routed = {query: list(new_products)}
+                if matcher:
+                    for product in new_products:
+                        for matched_query in matcher.match(product.title):
+                            if matched_query != query:
+                                routed.setdefault(matched_query, []).append(product)
+            
+                if not self.bot:
+                    continue
+            
+                # Рассылаем каждой подписке только товары, прошедшие ее фильтр
+                for routed_query, products in routed.items():
+                    batch = None  # Колонки страницы - одни на все подписки этого текста поиска
+                    for expression in plan.fetch_groups.get(routed_query, ()):
+                        subscription_filter = compile_filter(expression)
+                        if batch is None and not subscription_filter.is_plain:
+                            batch = ProductBatch.from_products(products)
+                        matched = subscription_filter.apply(products, batch)
+                        if not matched:
+                            continue
+                        user_ids = plan.recipients(expression)
+                        if not user_ids:
+                            continue
                     
-            except Exception as e:
-                print(f"❌ Ошибка при проверке пользователя {user_id_str}: {e}")
-        
-        # Также проверяем глобальные запросы для всех
-        await self.check_global_queries()
+                        print(f"  📨 '{expression}': {len(matched)} товаров → {len(user_ids)} подписчиков")
+                        for user_id in sorted(user_ids):
+                            sent = delivered.setdefault(user_id, set())
+                            fresh = [p for p in matched if p.id not in sent]
+                            if fresh:
+                                sent.update(p.id for p in fresh)
+                                await self.bot.send_user_new_products(user_id, fresh, expression)
         
+
         self.last_check = time.strftime('%Y-%m-%d %H:%M:%S')
         print(f"✅ Проверка завершена в {self.last_check}. Всего найдено: {total_found}")
-    
-    async def check_global_queries(self):
-        """Проверка глобальных запросов"""
-        from storage.files import load_search_queries
-        
-        queries = load_search_queries()
-        if not queries:
-            print("📭 Нет глобальных запросов")
-            return
-        
-        print(f"🌐 Проверяю {len(queries)} глобальных запросов...")
-        
-        found_products = []
-        
-        for query in queries:
-            try:
-                new_products = await self.check_query(query)
-                if new_products:
-                    found_products.extend(new_products)
-            except Exception as e:
-                print(f"❌ Ошибка при проверке глобального запроса '{query}': {e}")
-        
-        # Отправляем товары всем пользователям
-        if found_products and self.bot:
-            # Группируем по запросу
-            products_by_query = {}
-            for product in found_products:
-                if product.query not in products_by_query:
-                    products_by_query[product.query] = []
-                products_by_query[product.query].append(product)
-            
-            # Отправляем уведомления для каждого запроса
-            for query, products in products_by_query.items():
-                await self.bot.send_global_new_products(products, query)
+        print(f"   📄 Страниц запрошено: {self.cycle_stats['pages_fetched']}, "
+              f"пропущено по возрасту: {self.cycle_stats['pages_saved']}, "
+              f"остановок по watermark: {self.cycle_stats['watermark_stops']}")
+        print(f"   🧩 Запросов к API сэкономлено вложением запросов: {plan.subsumed_fetches}")
     
     async def check_query(self, query: str):
         """Проверка одного запроса с учетом ВСЕХ настроек"""
+        products, _ = await self.fetch_query(query)
+        return products
+    
+    async def fetch_query(self, query: str, max_pages: int = None):
+        """Проверка запроса: (новые товары, пройдено ли все окно по возрасту)
+        
+        Окно считается пройденным, если обход остановился на watermark, на
+        товаре старше max_age_minutes или на конце выдачи, а не на лимите страниц.
+        """
         print(f"  📝 Запрос: '{query}'")
         
         all_products = []
         
         # Поиск по нескольким страницам (используем настройки)
-        max_pages = int(self.settings.max_pages)
+        max_pages = int(max_pages or self.settings.max_pages)
+        
+        # Мало бюджета запросов на час - проходим меньше страниц, но не останавливаемся
+        budget_pages = request_budget.pages_allowed(max_pages)
+        if budget_pages < max_pages:
+            print(f"    💸 Бюджет запросов на исходе: {budget_pages} стр. вместо {max_pages}")
+            max_pages = budget_pages
         rows_per_page = int(self.settings.rows_per_page)
+        max_age_minutes = self.settings.max_age_minutes
+        
+        # Watermark: самые свежие товары, обработанные прошлой проверкой
+        # (по каноническому ключу - не зависит от того, чье написание запроса выбрано)
+        watermark_key = canonical_query(query)
+        watermark = get_query_watermark(watermark_key)
+        newest_time = None
+        newest_ids = []
+        completed = False
+        window_covered = False
         
         for page in range(1, max_pages + 1):
             try:
                 print(f"    📄 Страница {page}/{max_pages}")
                 
-                products = self.parser.search(
+                products, page_stats = await self.parser.search_page_async(
                     query=query,
                     page=page,
                     rows=rows_per_page,
                     only_new=True,
-                    max_age_minutes=self.settings.max_age_minutes
+                    max_age_minutes=max_age_minutes,
+                    watermark=watermark
                 )
+                self.cycle_stats['pages_fetched'] += 1
                 
-                if not products:
-                    print(f"    📭 Нет товаров на странице {page}")
+                page_newest = page_stats.get('newest_publish_time')
+                if page_newest and (newest_time is None or page_newest > newest_time):
+                    newest_time = page_newest
+                    newest_ids = page_stats.get('newest_ids') or []
+                
+                if products:
+                    print(f"    🎯 Найдено: {len(products)} новых")
+                    all_products.extend(products)
+                
+                if page_stats.get('watermark_reached'):
+                    self.cycle_stats['watermark_stops'] += 1
+                    print(f"    🔖 Достигнут watermark на стр. {page} - дальше всё уже обработано")
+                    completed = window_covered = True
                     break
                 
-                print(f"    🎯 Найдено: {len(products)} новых")
-                all_products.extend(products)
+                # Выдача отсортирована по новизне: если самый старый товар страницы
+                # уже старше max_age_minutes, следующие страницы только старше
+                oldest = page_stats.get('oldest_age_minutes')
+                if max_age_minutes and oldest and oldest > max_age_minutes:
+                    skipped = max_pages - page
+                    self.cycle_stats['pages_saved'] += skipped
+                    print(f"    ⏹️ Старейший товар стр. {page}: {oldest:.0f} мин > {max_age_minutes} мин, "
+                          f"пропускаю {skipped} стр.")
+                    completed = window_covered = True
+                    break
                 
-                # Пауза между страницами (2 секунды)
-                await asyncio.sleep(2)
+                if not products:
+                    print(f"    📭 Нет товаров на странице {page}")
+                    completed = window_covered = bool(page_stats.get('total_api_items'))
+                    break
                 
             except Exception as e:
                 print(f"    ❌ Ошибка на странице {page}: {e}")
                 import traceback
                 traceback.print_exc()
                 break
+        else:
+            completed = True
+        
+        # Сдвигаем watermark только после полного прохода: при ошибке
+        # недочитанные страницы должны быть проверены в следующем цикле
+        if completed and newest_time:
+            save_query_watermark(watermark_key, newest_time, newest_ids)
         
         # Добавляем ID в seen_ids
         if all_products:
             new_ids = [p.id for p in all_products]
-            added = add_seen_ids(new_ids)
+            # Слияние дельты индекса (mmap) может занять заметное время - не в цикле событий
+            added = await asyncio.to_thread(add_seen_ids, new_ids)
             self.total_products += len(all_products)
             print(f"    💾 Сохранено {added} новых ID")
         
-        return all_products
+        return all_products, window_covered
     
     def stop(self):
         """Остановка мониторинга"""
@@ -250,7 +342,19 @@ class SimpleMonitor:
             'is_running': self.is_running,
             'cycles': self.cycles,
             'total_products': self.total_products,
-            'last_check': self.last_check
+            'last_check': self.last_check,
+            'unique_queries': len(self.last_plan.fetch_groups) if self.last_plan else 0,
+            'saved_fetches': self.last_plan.saved_fetches if self.last_plan else 0,
+            'subsumed_fetches': self.last_plan.subsumed_fetches if self.last_plan else 0,
+            'pages_fetched': self.cycle_stats['pages_fetched'],
+            'pages_saved': self.cycle_stats['pages_saved'],
+            'watermark_stops': self.cycle_stats['watermark_stops'],
+            'request_rate': rate_limiter.rate,
+            'rate_limited': rate_limiter.rate_limited,
+            'budget': request_budget.get_stats(),
+            'queue_wait': request_scheduler.get_stats(),
+            'deduplicated_requests': search_flight.shared,
+            'page_cache': page_cache.get_stats()
         }
 
 class GoofishBot:
@@ -282,7 +386,7 @@ class GoofishBot:
         if not self.application:
             return
         
-        from storage.files import load_users
+        from storage.backend import load_users
         users = load_users()
         
         for user_id_str in users:
@@ -5,21 +5,31 @@ import aiofiles
 import json
 import hashlib
 import time
-import random
 from typing import List, Dict, Optional, Tuple
 import logging
 
 from models import Product
+from parsers.extract import LazyItemIndex, item_plan, parse_price
+from parsers.stream import collect_result_list
 from config import (
     GOOFISH_COOKIES_FILE, ROWS_PER_PAGE, 
     REQUEST_TIMEOUT, DEFAULT_USER_AGENT,
-    MAX_RETRIES, REQUEST_DELAY_MIN, REQUEST_DELAY_MAX, 
-    RATE_LIMIT_DELAY, MAX_REQUESTS_PER_HOUR
+    MAX_RETRIES, STREAM_CHUNK_SIZE
 )
-from storage.files import load_seen_ids, add_seen_ids
+from storage.backend import seen_ids_store, add_seen_ids
+from utils import jsoncodec
+from utils.rate_limiter import rate_limiter
+from utils.budget import request_budget
+from utils.scheduler import request_scheduler, lane_for_page
+from utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+SIMPLE_PARSE_LIMIT = 15  # Сколько первых элементов страницы разбирает _parse_response_simple
+
+# Одинаковые одновременные (query, page, rows) - один запрос и один разбор
+request_flight = SingleFlight()
+
 class AsyncGoofishParser:
     """Асинхронный парсер для параллельных запросов"""
     
@@ -28,14 +38,14 @@ class AsyncGoofishParser:
         self.cookies = None
         self.session = None
         self.seen_ids = set()
-        self.semaphore = asyncio.Semaphore(3)  # Максимум 3 одновременных запроса
+        self.semaphore = asyncio.Semaphore(3)  # Максимум 3 одновременных запроса (темп - rate_limiter)
         self.request_count = 0
         self.success_count = 0
         
     async def initialize(self):
         """Асинхронная инициализация"""
         self.cookies = await self._load_cookies()
-        self.seen_ids = load_seen_ids()
+        self.seen_ids = seen_ids_store
         
         # Создаем сессию aiohttp
         self.session = aiohttp.ClientSession(
@@ -59,7 +69,7 @@ class AsyncGoofishParser:
         try:
             async with aiofiles.open(self.cookies_file, 'r', encoding='utf-8') as f:
                 content = await f.read()
-                cookies = json.loads(content)
+                cookies = jsoncodec.loads(content)
             
             # Проверяем обязательные cookies
             required = ['_m_h5_tk', 't', 'cookie2']
@@ -73,16 +83,16 @@ class AsyncGoofishParser:
             logger.error(f"❌ Ошибка загрузки cookies: {e}")
             return {}
     
-    async def _make_async_request(self, query: str, page: int, rows: int = 20) -> Optional[Dict]:
-        """Асинхронный запрос с семафором"""
+    async def _make_async_request(self, query: str, page: int, rows: int = 20,
+                                  max_items: int = None) -> Optional[Dict]:
+        """Асинхронный запрос с семафором
+
+        Тело читается потоком: при max_items чтение прекращается, как только
+        получено столько элементов resultList.
+        """
         async with self.semaphore:
             self.request_count += 1
             
-            # Случайная задержка
-            delay = random.uniform(REQUEST_DELAY_MIN, REQUEST_DELAY_MAX)
-            logger.debug(f"⏳ Задержка для '{query}': {delay:.1f} сек")
-            await asyncio.sleep(delay)
-            
             for attempt in range(MAX_RETRIES):
                 try:
                     if attempt > 0:
@@ -90,6 +100,10 @@ class AsyncGoofishParser:
                         logger.info(f"   ↻ Повтор {attempt + 1} для '{query}'. Ждем {retry_delay:.1f} сек")
                         await asyncio.sleep(retry_delay)
                     
+                    # Общий адаптивный темп (после rate limit здесь же выдерживается пауза)
+                    delay = await request_scheduler.acquire_async(lane_for_page(page))
+                    logger.debug(f"⏳ Задержка для '{query}': {delay:.1f} сек")
+                    
                     # Подготовка запроса
                     token_full = self.cookies.get('_m_h5_tk', '')
                     if not token_full or '_' not in token_full:
@@ -133,7 +147,17 @@ class AsyncGoofishParser:
                     ) as response:
                         
                         if response.status == 200:
-                            result = await response.json()
+                            result = await collect_result_list(
+                                response.content.iter_chunked(STREAM_CHUNK_SIZE), max_items
+                            )
+                            if result is None:
+                                return None
+                            
+                            if result.get('streamed'):
+                                self.success_count += 1
+                                rate_limiter.on_success()
+                                logger.info(f"✅ Успех для '{query}' (потоком)")
+                                return result
                             
                             if 'ret' in result:
                                 ret_val = result['ret']
@@ -142,19 +166,20 @@ class AsyncGoofishParser:
                                     
                                     if 'SUCCESS' in ret_str:
                                         self.success_count += 1
+                                        rate_limiter.on_success()
                                         logger.info(f"✅ Успех для '{query}'")
                                         return result
                                     
                                     elif 'RGV587_ERROR' in ret_str:
                                         logger.warning(f"🚫 Rate limit для '{query}'")
-                                        await asyncio.sleep(RATE_LIMIT_DELAY)
+                                        rate_limiter.on_rate_limited()
                                         continue
                             
                             return result
                         
                         elif response.status == 429:
                             logger.error(f"❌ 429 для '{query}'")
-                            await asyncio.sleep(RATE_LIMIT_DELAY)
+                            rate_limiter.on_rate_limited()
                             continue
                         
                         else:
@@ -176,11 +201,7 @@ class AsyncGoofishParser:
         """Асинхронный поиск"""
         logger.info(f"🔍 Асинхронный поиск: '{query}', стр. {page}")
         
-        response = await self._make_async_request(query, page, rows)
-        if not response:
-            return []
-        
-        products = self._parse_response_simple(response, query)
+        products = await request_flight.do_async((query, page, rows), self._fetch_products, query, page, rows)
         new_products = [p for p in products if p.id not in self.seen_ids]
         
         if new_products:
@@ -190,8 +211,15 @@ class AsyncGoofishParser:
         logger.info(f"   ✅ Найдено: {len(products)}, новых: {len(new_products)}")
         return new_products
     
+    async def _fetch_products(self, query: str, page: int, rows: int) -> List[Product]:
+        """Запрос страницы и разбор (без фильтра новизны - он у каждого вызова свой)"""
+        response = await self._make_async_request(query, page, rows, max_items=SIMPLE_PARSE_LIMIT)
+        if not response:
+            return []
+        return self._parse_response_simple(response, query)
+    
     def _parse_response_simple(self, api_response: Dict, query: str) -> List[Product]:
-        """Упрощенный парсинг (можно использовать общий)"""
+        """Упрощенный парсинг по общему плану извлечения (parsers/extract.py)"""
         products = []
         
         if not api_response:
@@ -199,41 +227,37 @@ class AsyncGoofishParser:
         
         data = api_response.get('data', {})
         result_list = data.get('resultList', [])
+        item_index = LazyItemIndex(result_list)
+        current_time_ms = time.time() * 1000
         
-        for item in result_list[:15]:  # Ограничиваем
+        for item in result_list[:SIMPLE_PARSE_LIMIT]:  # Ограничиваем
             try:
-                item_data = item.get('data', {}).get('item', {})
-                if not item_data:
-                    continue
+                item_data, _ = item_plan.resolve_data(item, item_index)
+                item_id = item_plan.get('id', item, item_data)
+                title = item_plan.get('title', item, item_data)
                 
-                main_data = item_data.get('main', {})
-                args = main_data.get('clickParam', {}).get('args', {})
-                
-                if not args:
+                if not item_id or not title:
                     continue
                 
-                item_id = args.get('id', '')
-                title = args.get('title', '')[:100]
-                price_str = args.get('price', '0')
+                price = parse_price(item_plan.get('price', item, item_data) or '0') or 0.0
                 
-                try:
-                    price_str = price_str.replace('¥', '').replace('￥', '').strip()
-                    price_yuan = float(price_str)
-                except:
-                    price_yuan = 0
-                
-                if not item_id or not title:
-                    continue
+                age_minutes = 0
+                publish_time = item_plan.get('publish_time', item, item_data)
+                if publish_time:
+                    try:
+                        age_minutes = round((current_time_ms - int(publish_time)) / (1000 * 60), 1)
+                    except ValueError:
+                        pass
                 
                 product = Product(
-                    id=item_id,
-                    title=title,
-                    price_yuan=price_yuan,
+                    id=str(item_id),
+                    title=title[:100],
+                    price=price,
                     url=f"https://www.goofish.com/item?id={item_id}",
-                    location=args.get('area', ''),
-                    age_minutes=0,
+                    location=item_plan.get('location', item, item_data) or '',
+                    age_minutes=age_minutes,
                     query=query,
-                    images=[],
+                    images=item_plan.images(item, item_data),
                     is_original=False
                 )
                 
@@ -290,4 +314,9 @@ class AsyncGoofishParser:
             'successful_requests': self.success_count,
             'success_rate': round(success_rate, 1),
             'active_sessions': self.semaphore._value if self.semaphore else 0,
+            'rate_limiter': rate_limiter.get_stats(),
+            'budget': request_budget.get_stats(),
+            'queue_wait': request_scheduler.get_stats(),
+            'single_flight': request_flight.get_stats(),
+            'extraction_paths': item_plan.stats(),
         }
\ No newline at end of file
@@ -0,0 +1,365 @@
+# parsers/extract.py - общие функции извлечения данных из resultList Goofish
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def get_main(item: Dict) -> Dict:
+    """Блок data.item.main элемента выдачи"""
+    if not isinstance(item, dict):
+        return {}
+    return item.get('data', {}).get('item', {}).get('main', {}) or {}
+
+
+def get_click_args(item: Dict) -> Dict:
+    """Основной путь к данным: data.item.main.clickParam.args"""
+    return get_main(item).get('clickParam', {}).get('args', {}) or {}
+
+
+def get_ex_content(item: Dict) -> Dict:
+    """Альтернативный блок: data.item.main.exContent"""
+    return get_main(item).get('exContent', {}) or {}
+
+
+def build_item_index(result_list: List[Dict]) -> Dict[str, Dict]:
+    """Индекс страницы: ID товара -> clickParam.args
+
+    Строится за один проход по странице, после чего перекрестный поиск
+    через exContent выполняется за O(1) вместо полного перебора resultList
+    для каждого элемента. Элемент индексируется по всем известным ему ID:
+    args.id и exContent.itemId.
+    """
+    index = {}
+
+    for elem in result_list:
+        args = get_click_args(elem)
+        if not args:
+            continue
+
+        keys = (args.get('id'), get_ex_content(elem).get('itemId'))
+        for key in keys:
+            if key in (None, '', 'None'):
+                continue
+            # Первое вхождение выигрывает - как при линейном поиске
+            index.setdefault(str(key), args)
+
+    return index
+
+
+class LazyItemIndex:
+    """build_item_index, построенный при первом обращении
+
+    Индекс нужен только элементам без clickParam.args; на страницах, где
+    они не встречаются, проход по странице не выполняется вовсе. Список
+    может расти (потоковое чтение resultList): новые элементы
+    доиндексируются при обращении, а при промахе fill() дочитывает поток,
+    пока ID не найдется или поток не закончится.
+    """
+
+    def __init__(self, result_list: List[Dict], fill: Callable[[], bool] = None):
+        self._result_list = result_list
+        self._fill = fill
+        self._index: Dict[str, Dict] = {}
+        self._indexed = 0
+
+    def _extend(self):
+        if self._indexed < len(self._result_list):
+            new_items = self._result_list[self._indexed:]
+            self._indexed = len(self._result_list)
+            for item_key, args in build_item_index(new_items).items():
+                self._index.setdefault(item_key, args)
+
+    def get(self, key: str, default=None):
+        self._extend()
+        value = self._index.get(key)
+        while value is None and self._fill is not None and self._fill():
+            self._extend()
+            value = self._index.get(key)
+        return default if value is None else value
+
+
+# ==================== Компилируемый план извлечения ====================
+
+_EMPTY: Dict = {}
+_MAX_INLINE_DEPTH = 6  # Пути глубже собираются циклом
+
+
+def compile_path(path: str) -> Callable[[Dict], object]:
+    """Путь вида 'data.item.main' -> функция доступа одной цепочкой .get()
+
+    Для путей до _MAX_INLINE_DEPTH ключей замыкание - прямая цепочка
+    obj.get(k0, {}).get(k1, {})... без цикла и разбора строки при вызове.
+    Отсутствующее или не-словарное промежуточное значение дает None.
+    """
+    keys = tuple(path.split('.'))
+    depth = len(keys)
+    E = _EMPTY
+
+    # AttributeError - промежуточное значение не словарь
+    if depth == 1:
+        k0, = keys
+        def get(obj):
+            try:
+                return obj.get(k0)
+            except AttributeError:
+                return None
+    elif depth == 2:
+        k0, k1 = keys
+        def get(obj):
+            try:
+                return obj.get(k0, E).get(k1)
+            except AttributeError:
+                return None
+    elif depth == 3:
+        k0, k1, k2 = keys
+        def get(obj):
+            try:
+                return obj.get(k0, E).get(k1, E).get(k2)
+            except AttributeError:
+                return None
+    elif depth == 4:
+        k0, k1, k2, k3 = keys
+        def get(obj):
+            try:
+                return obj.get(k0, E).get(k1, E).get(k2, E).get(k3)
+            except AttributeError:
+                return None
+    elif depth == 5:
+        k0, k1, k2, k3, k4 = keys
+        def get(obj):
+            try:
+                return obj.get(k0, E).get(k1, E).get(k2, E).get(k3, E).get(k4)
+            except AttributeError:
+                return None
+    elif depth == _MAX_INLINE_DEPTH:
+        k0, k1, k2, k3, k4, k5 = keys
+        def get(obj):
+            try:
+                return obj.get(k0, E).get(k1, E).get(k2, E).get(k3, E).get(k4, E).get(k5)
+            except AttributeError:
+                return None
+    else:
+        def get(obj):
+            try:
+                for key in keys[:-1]:
+                    obj = obj.get(key, E)
+                return obj.get(keys[-1])
+            except AttributeError:
+                return None
+
+    get.__name__ = f"get_{path.replace('.', '_')}"
+    return get
+
+
+class ExtractPath:
+    """Один способ получить поле: путь от элемента выдачи или от данных товара"""
+
+    def __init__(self, name: str, item: str = None, data: str = None, func: Callable = None):
+        self.name = name
+        self.func = func  # func(item, data, ctx) - путь, который не сводится к цепочке ключей
+        self.on_item = item is not None
+        self.get = compile_path(item if self.on_item else data) if func is None else None
+        self.tries = 0
+        self.hits = 0
+
+    def __call__(self, item: Dict, data: Dict, ctx=None):
+        if self.func is not None:
+            return self.func(item, data, ctx)
+        return self.get(item if self.on_item else data)
+
+
+def _is_present(value) -> bool:
+    if value is None:
+        return False
+    cls = value.__class__
+    if cls is str:
+        return value != '' and value != 'None'
+    if cls is dict or cls is list:
+        return len(value) > 0
+    return value not in ('', 'None', {}, [])
+
+
+class FieldExtractor:
+    """Поле товара с несколькими путями: первый давший значение путь по порядку схемы
+
+    Порядок ITEM_SCHEMA - приоритет источников, и он не меняется: пути
+    одного поля могут вернуть для одного товара разные значения (например,
+    detailParams.title и title), так что перестановка по доле успехов
+    меняла бы результат. Следующий путь пробуется только при промахе
+    предыдущего; счетчики (попытки / успехи) показывают, как часто
+    срабатывают запасные пути, - смена схемы ответа Goofish видна по ним.
+    """
+
+    def __init__(self, name: str, paths: List[ExtractPath], valid: Callable = _is_present):
+        self.name = name
+        self.paths = list(paths)
+        self.valid = valid
+        self._str_check = valid is _is_present  # Строку можно проверить на месте, без вызова valid
+        self._first = self.paths[0]
+        self._rest = self.paths[1:]
+        # Основной путь срабатывает почти всегда: для него считаются только
+        # вызовы и промахи, попытки и успехи выводятся из них в stats()
+        self._calls = 0
+        self._first_misses = 0
+
+    def value(self, item: Dict, data: Dict = None, ctx=None):
+        """Значение поля или None"""
+        self._calls += 1
+        first = self._first
+        if first.func is not None:
+            value = first.func(item, data, ctx)
+        else:
+            value = first.get(item if first.on_item else data)
+        if value.__class__ is str and self._str_check:  # Самый частый случай
+            if value != '' and value != 'None':
+                return value
+        elif value is not None and self.valid(value):
+            return value
+        self._first_misses += 1
+        return self._extract_rest(item, data, ctx)[0]
+
+    def extract(self, item: Dict, data: Dict = None, ctx=None) -> Tuple[object, str]:
+        """(значение, имя пути) или (None, '')"""
+        self._calls += 1
+        value = self._first(item, data, ctx)
+        if value is not None and self.valid(value):
+            return value, self._first.name
+        self._first_misses += 1
+        return self._extract_rest(item, data, ctx)
+
+    def _extract_rest(self, item: Dict, data: Dict, ctx) -> Tuple[object, str]:
+        valid = self.valid
+        for path in self._rest:
+            path.tries += 1
+            value = path(item, data, ctx)
+            if valid(value):
+                path.hits += 1
+                return value, path.name
+        return None, ''
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        stats = {self._first.name: {'tries': self._calls, 'hits': self._calls - self._first_misses}}
+        stats.update((p.name, {'tries': p.tries, 'hits': p.hits}) for p in self._rest)
+        return stats
+
+
+def _cross_reference(item: Dict, data: Dict, item_index) -> Optional[Dict]:
+    """exContent.itemId -> clickParam.args дубликата на той же странице"""
+    item_id = get_ex_content(item).get('itemId', '')
+    if not item_id or item_index is None:
+        return None
+    return item_index.get(str(item_id))
+
+
+def _is_http_url(value) -> bool:
+    return isinstance(value, str) and value.startswith('http')
+
+
+# Схема ответа mtop.taobao.idlemtopsearch.pc.search - пути объявлены один раз
+ITEM_SCHEMA = {
+    'data': [
+        ExtractPath('main.clickParam.args', item='data.item.main.clickParam.args'),
+        ExtractPath('exContent cross-reference', func=_cross_reference),
+        ExtractPath('data.item', item='data.item'),
+    ],
+    'id': [
+        ExtractPath('args.id', data='id'),
+    ],
+    'publish_time': [
+        ExtractPath('args.publishTime', data='publishTime'),
+    ],
+    'title': [
+        ExtractPath('args.detailParams.title', data='detailParams.title'),
+        ExtractPath('exContent.detailParams.title', item='data.item.main.exContent.detailParams.title'),
+        ExtractPath('args.title', data='title'),
+    ],
+    'price': [
+        ExtractPath('args.price', data='price'),
+    ],
+    'location': [
+        ExtractPath('args.area', data='area'),
+        ExtractPath('exContent.area', item='data.item.main.exContent.area'),
+    ],
+}
+
+IMAGE_PATHS = {
+    'picUrl': ExtractPath('args.picUrl', data='picUrl'),
+    'pics': ExtractPath('args.pics', data='pics'),
+    'exContent.picUrl': ExtractPath('exContent.picUrl', item='data.item.main.exContent.picUrl'),
+}
+
+_PRICE_RE = re.compile(r'[^\d\.]')
+
+
+def parse_price(price_str) -> Optional[float]:
+    """Цена в юанях из строки API ('¥1,299.00' -> 1299.0); None - не разобрать"""
+    try:
+        price_clean = _PRICE_RE.sub('', str(price_str))
+        return float(price_clean) if price_clean else 0.0
+    except ValueError:
+        return None
+
+
+class ExtractionPlan:
+    """Скомпилированный план извлечения полей товара по ITEM_SCHEMA"""
+
+    def __init__(self, schema: Dict[str, List[ExtractPath]] = None):
+        self.fields = {name: FieldExtractor(name, paths) for name, paths in (schema or ITEM_SCHEMA).items()}
+        self.image_paths = IMAGE_PATHS
+        self._values = {name: field.value for name, field in self.fields.items()}
+
+    def resolve_data(self, item: Dict, item_index=None) -> Tuple[Dict, str]:
+        """Блок данных товара и путь, по которому он найден"""
+        data, path = self.fields['data'].extract(item, None, item_index)
+        return (data, path) if isinstance(data, dict) else ({}, '')
+
+    def get(self, field: str, item: Dict, data: Dict):
+        return self._values[field](item, data)
+
+    def images(self, item: Dict, data: Dict, limit: int = 3) -> List[str]:
+        """Фото: picUrl + до limit из pics, иначе exContent.picUrl"""
+        images = []
+        paths = self.image_paths
+
+        pic_url = self._try(paths['picUrl'], item, data, _is_http_url)
+        if pic_url:
+            images.append(pic_url)
+
+        pics = self._try(paths['pics'], item, data, lambda v: isinstance(v, list) and v)
+        if pics:
+            for pic in pics[:limit]:
+                img_url = pic.get('picUrl') if isinstance(pic, dict) else None
+                if _is_http_url(img_url) and img_url not in images:
+                    images.append(img_url)
+
+        if not images:
+            pic_url = self._try(paths['exContent.picUrl'], item, data, _is_http_url)
+            if pic_url:
+                images.append(pic_url)
+
+        return images
+
+    @staticmethod
+    def _try(path: ExtractPath, item: Dict, data: Dict, valid: Callable):
+        path.tries += 1
+        value = path(item, data)
+        if valid(value):
+            path.hits += 1
+            return value
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Счетчики по полям и путям: {поле: {путь: {'tries', 'hits'}}}"""
+        stats = {name: field.stats() for name, field in self.fields.items()}
+        stats['images'] = {p.name: {'tries': p.tries, 'hits': p.hits} for p in self.image_paths.values()}
+        return stats
+
+    def print_stats(self):
+        print(f"\n📐 ПУТИ ИЗВЛЕЧЕНИЯ (успехов / попыток):")
+        for field, paths in self.stats().items():
+            used = [f"{name}: {s['hits']}/{s['tries']}" for name, s in paths.items() if s['tries']]
+            if used:
+                print(f"   • {field}: " + ', '.join(used))
+
+
+# Общий план для обоих парсеров: счетчики копятся за всё время работы
+item_plan = ExtractionPlan()
@@ -1,31 +1,56 @@
 # parsers/goofish.py - ВЕРСИЯ С ДИАГНОСТИКОЙ ПОТЕРЬ И ФОТО
 import requests
+import asyncio
+import functools
 import json
 import time
 import hashlib
-import re
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 from models import Product
+from parsers.extract import LazyItemIndex, item_plan, parse_price
+from parsers.stream import ResultListStream
+from parsers.result_cache import page_cache
+from core.normalize import normalize_text
+from core.batch import ProductBatch, ProductBatchBuilder
 from config import (
     GOOFISH_COOKIES_FILE, ROWS_PER_PAGE, 
-    REQUEST_TIMEOUT, DEFAULT_USER_AGENT
+    REQUEST_TIMEOUT, DEFAULT_USER_AGENT, WATERMARK_GRACE_ITEMS,
+    PARSER_MAX_WORKERS, STREAM_CHUNK_SIZE
 )
-from storage.files import load_seen_ids, add_seen_ids
+from storage.backend import seen_ids_store
+from utils import jsoncodec
+from utils.rate_limiter import rate_limiter
+from utils.scheduler import LANE_INTERACTIVE, request_scheduler, lane_for_page
+from utils.singleflight import SingleFlight
 
 # Отключаем предупреждения SSL для чистоты логов
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Ограниченный пул потоков для блокирующих запросов (requests + time.sleep),
+# чтобы не останавливать event loop бота
+_executor = ThreadPoolExecutor(max_workers=PARSER_MAX_WORKERS, thread_name_prefix="goofish")
+# Отдельные потоки для /search: не ждут в очереди пула за страницами мониторинга
+_interactive_executor = ThreadPoolExecutor(max_workers=PARSER_MAX_WORKERS, thread_name_prefix="goofish-search")
+
+# Одновременные запросы одной страницы (query, page, rows) от мониторинга и
+# /search - один запрос к API; фильтры каждый вызов применяет сам
+search_flight = SingleFlight()
+
 class GoofishParser:
     """Парсер для Goofish с диагностикой потерь данных"""
     
     def __init__(self, cookies_file=None):
         self.base_url = "https://h5api.m.goofish.com/h5/mtop.taobao.idlemtopsearch.pc.search/1.0/"
         self.cookies_file = cookies_file or GOOFISH_COOKIES_FILE
+        self.cookies_mtime = self._cookies_file_mtime()
         self.cookies = self._load_cookies()
         self.session = self._create_session()
-        self.seen_ids = load_seen_ids()
+        self.seen_ids = seen_ids_store  # Общее живое множество, без копии на каждый парсер
         
         print(f"✅ Парсер инициализирован. Cookies: {len(self.cookies)}")
         
@@ -40,12 +65,25 @@ class GoofishParser:
             'final_products': 0
         }
     
+    def _cookies_file_mtime(self) -> Optional[int]:
+        try:
+            return self.cookies_file.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def reload_cookies(self):
+        """Перечитать cookies (после обновления файла) и пересоздать сессию"""
+        self.cookies_mtime = self._cookies_file_mtime()
+        self.cookies = self._load_cookies()
+        self.session = self._create_session()
+        print(f"🔄 Cookies парсера перечитаны: {len(self.cookies)}")
+    
     def _load_cookies(self) -> Dict:
         """Загрузка cookies"""
         if self.cookies_file.exists():
             try:
-                with open(self.cookies_file, 'r', encoding='utf-8') as f:
-                    cookies = json.load(f)
+                with open(self.cookies_file, 'rb') as f:
+                    cookies = jsoncodec.load(f)
                 
                 required = ['_m_h5_tk', 't', 'cookie2']
                 missing = [r for r in required if r not in cookies]
@@ -77,8 +115,15 @@ class GoofishParser:
         
         return session
     
-    def _make_request(self, query: str, page: int, rows: int) -> Optional[Dict]:
-        """Выполнение запроса к API"""
+    def _make_request(self, query: str, page: int, rows: int, stream: bool = False,
+                      lane: str = None) -> Union[Dict, ResultListStream, None]:
+        """Выполнение запроса к API
+
+        С stream=True тело читается по фрагментам: если в ответе есть
+        resultList, возвращается ResultListStream, и элементы декодируются
+        по мере чтения (остаток тела можно не читать). lane - полоса очереди
+        запросов (utils/scheduler.py), по умолчанию по номеру страницы.
+        """
         try:
             timestamp = str(int(time.time() * 1000))
             
@@ -129,19 +174,35 @@ class GoofishParser:
             
             print(f"\n🔧 Запрос: '{query}', стр {page}, rows={rows}")
             
-            time.sleep(2)
+            # Темп общий для всех парсеров процесса и подстраивается под ответы API;
+            # очередь пропускает /search раньше страниц мониторинга
+            waited = request_scheduler.acquire(lane or lane_for_page(page))
+            if waited >= 1:
+                print(f"   ⏳ Ожидание очереди запросов: {waited:.1f} с")
             
             response = self.session.post(
                 self.base_url, 
                 params=params, 
                 timeout=REQUEST_TIMEOUT,
-                verify=False
+                verify=False,
+                stream=stream
             )
             
             print(f"   Статус: {response.status_code}")
             
             if response.status_code == 200:
-                result = response.json()
+                if stream:
+                    result = ResultListStream.open(
+                        response.iter_content(chunk_size=STREAM_CHUNK_SIZE), on_close=response.close
+                    )
+                    if isinstance(result, ResultListStream):
+                        print(f"   📡 Потоковое чтение resultList")
+                        rate_limiter.on_success()
+                        return result
+                    if result is None:
+                        return None
+                else:
+                    result = jsoncodec.loads(response.content)
                 
                 if 'ret' in result:
                     ret_val = result['ret']
@@ -151,15 +212,19 @@ class GoofishParser:
                         
                         if 'SUCCESS' in ret_str:
                             print(f"✅ УСПЕХ!")
+                            rate_limiter.on_success()
                             return result
                         elif 'RGV587_ERROR' in ret_str:
                             print(f"🚫 RATE LIMIT обнаружен!")
-                            time.sleep(30)
+                            rate_limiter.on_rate_limited()
                             return None
                 
                 return result
             else:
                 print(f"❌ HTTP ошибка: {response.status_code}")
+                response.close()
+                if response.status_code == 429:
+                    rate_limiter.on_rate_limited()
                 
         except Exception as e:
             print(f"❌ Ошибка запроса: {e}")
@@ -169,63 +234,185 @@ class GoofishParser:
         return None
     
     def search(self, query: str, page: int = 1, rows: int = None, 
-               only_new: bool = True, max_age_minutes: float = None) -> List[Product]:
+               only_new: bool = True, max_age_minutes: float = None,
+               lane: str = None) -> List[Product]:
         """Поиск товаров с ДИАГНОСТИКОЙ потерь"""
+        products, _ = self.search_page(query, page, rows, only_new, max_age_minutes, lane=lane)
+        return products
+    
+    async def search_async(self, query: str, page: int = 1, rows: int = None,
+                           only_new: bool = True, max_age_minutes: float = None,
+                           lane: str = None) -> List[Product]:
+        """Неблокирующий search() для вызова из event loop"""
+        products, _ = await self.search_page_async(query, page, rows, only_new, max_age_minutes, lane=lane)
+        return products
+    
+    async def search_page_async(self, *args, **kwargs) -> Tuple[List[Product], Dict]:
+        """Неблокирующий search_page(): выполняется в пуле потоков парсера"""
+        loop = asyncio.get_running_loop()
+        executor = _interactive_executor if kwargs.get('lane') == LANE_INTERACTIVE else _executor
+        return await loop.run_in_executor(
+            executor, functools.partial(self.search_page, *args, **kwargs)
+        )
+    
+    def search_page(self, query: str, page: int = 1, rows: int = None,
+                    only_new: bool = True, max_age_minutes: float = None,
+                    watermark: Optional[Dict] = None, lane: str = None) -> Tuple[List[Product], Dict]:
+        """Поиск одной страницы: товары + статистика страницы (для управления пагинацией)"""
         rows = rows or ROWS_PER_PAGE
         
-        # Сбрасываем статистику
-        self.stats = {k: 0 for k in self.stats}
+        # Статистика этого вызова (парсер общий - вызовы идут параллельно)
+        stats = {k: 0 for k in self.stats}
         
         print(f"\n🔍 Поиск: '{query}', стр {page}, rows={rows}")
         print(f"   Фильтры: возраст ≤ {max_age_minutes or '∞'} мин, новые: {only_new}")
         
-        response = self._make_request(query, page, rows)
-        if not response:
-            return []
-        
-        # Шаг 1: Парсинг ответа
-        products, parse_stats = self._parse_response_debug(response, query)
-        self.stats.update(parse_stats)
+        batch, parse_stats = self._fetch_page(query, page, rows, only_new, max_age_minutes, watermark, lane)
+        if batch is None:
+            self.stats = stats
+            return [], dict(stats)
+        stats.update(parse_stats)
         
         print(f"\n📊 ДИАГНОСТИКА ПАРСИНГА:")
-        print(f"   📦 Всего элементов в API: {self.stats['total_api_items']}")
-        print(f"   ✅ Успешно распарсено: {self.stats['valid_items']}")
-        print(f"   ❌ Невалидные/пропущенные: {self.stats['invalid_items']}")
+        if stats.get('from_cache'):
+            print(f"   ⚡ Страница из кэша (без запроса к API)")
+        print(f"   📦 Всего элементов в API: {stats['total_api_items']}")
+        print(f"   ✅ Успешно распарсено: {stats['valid_items']}")
+        print(f"   ❌ Невалидные/пропущенные: {stats['invalid_items']}")
         
-        if self.stats['filtered_by_query'] > 0:
-            print(f"   🔍 Отфильтровано по запросу: {self.stats['filtered_by_query']}")
+        if stats['filtered_by_query'] > 0:
+            print(f"   🔍 Отфильтровано по запросу: {stats['filtered_by_query']}")
         
-        # Шаг 2: Фильтрация по возрасту
-        if max_age_minutes is not None:
-            before = len(products)
-            products = [p for p in products if p.age_minutes <= max_age_minutes]
-            self.stats['filtered_by_age'] = before - len(products)
-            print(f"   ⏳ Отфильтровано по возрасту: {self.stats['filtered_by_age']}")
+        if stats['watermark_reached']:
+            print(f"   🔖 Достигнут watermark запроса - дальше только обработанные товары")
+        
+        if stats['age_limit_reached']:
+            print(f"   ⏹️ Товары старше {max_age_minutes} мин - остаток страницы не разбирался")
         
-        print(f"   📦 После фильтров: {len(products)} товаров")
+        if max_age_minutes is not None:
+            print(f"   ⏳ Отфильтровано по возрасту: {stats['filtered_by_age']}")
         
-        # Шаг 3: Фильтрация по новизне
         if only_new:
-            new_products = self._filter_new_products(products)
-            self.stats['filtered_by_seen'] = len(products) - len(new_products)
-            self.stats['final_products'] = len(new_products)
-            
-            print(f"   🆕 Отфильтровано (уже видели): {self.stats['filtered_by_seen']}")
-            print(f"   🎯 ФИНАЛЬНО новых: {self.stats['final_products']}")
-            
-            return new_products
+            print(f"   🆕 Отфильтровано (уже видели): {stats['filtered_by_seen']}")
         
-        self.stats['final_products'] = len(products)
-        return products
+        stats['final_products'] = len(batch)
+        print(f"   🎯 ФИНАЛЬНО новых: {stats['final_products']}")
+        
+        self.stats = stats
+        return batch.to_products(), dict(stats)
+    
+    def _fetch_page(self, query: str, page: int, rows: int, only_new: bool,
+                    max_age_minutes: Optional[float], watermark: Optional[Dict],
+                    lane: Optional[str]) -> Tuple[Optional[ProductBatch], Dict]:
+        """Страница, разобранная в партию; (None, {}) - ответа нет
+
+        Сначала проверяется page_cache: страница, прочитанная недавно
+        (мониторингом, /search или кнопкой листания), разбирается из памяти.
+        Иначе запрос к API идет через search_flight по ключу (query, page, rows):
+        одновременные вызовы с любыми фильтрами ждут один запрос и разбирают
+        его элементы из page_cache каждый со своими фильтрами.
+        """
+        cache_key = (query, page, rows)
+        cached = self._parse_cached(cache_key, query, only_new, max_age_minutes, watermark)
+        if cached is not None:
+            return cached
+        
+        own = {}
+        
+        def request():
+            own['result'] = self._request_page(query, page, rows, only_new, max_age_minutes, watermark, lane)
+            return own['result'][0] is not None
+        
+        got_response = search_flight.do(cache_key, request)
+        if 'result' in own:
+            return own['result']
+        if not got_response:
+            return None, {}
+        
+        # Запрос выполнил другой вызов - его элементы уже в page_cache
+        cached = self._parse_cached(cache_key, query, only_new, max_age_minutes, watermark)
+        if cached is not None:
+            return cached
+        # Тот вызов остановил чтение раньше, чем нужно этому
+        return self._request_page(query, page, rows, only_new, max_age_minutes, watermark, lane)
+    
+    def _parse_cached(self, cache_key: tuple, query: str, only_new: bool,
+                      max_age_minutes: Optional[float],
+                      watermark: Optional[Dict]) -> Optional[Tuple[ProductBatch, Dict]]:
+        """Разбор страницы из page_cache; None - страницы нет или ее префикса не хватает"""
+        cached = page_cache.get(cache_key)
+        if cached is None:
+            return None
+        items, complete = cached
+        batch, stats = self._parse_response_debug(
+            {'data': {'resultList': items}}, query, watermark,
+            max_age_minutes=max_age_minutes, only_new=only_new
+        )
+        # Префикс страницы годится, только если разбор остановился внутри него
+        if not (complete or stats['watermark_reached'] or stats['age_limit_reached']):
+            return None
+        stats['from_cache'] = True
+        return batch, stats
     
-    def _parse_response_debug(self, api_response: Dict, query: str) -> Tuple[List[Product], Dict]:
-        """Парсинг ответа с ДЕТАЛЬНОЙ диагностикой"""
-        products = []
+    def _request_page(self, query: str, page: int, rows: int, only_new: bool,
+                      max_age_minutes: Optional[float], watermark: Optional[Dict],
+                      lane: Optional[str]) -> Tuple[Optional[ProductBatch], Dict]:
+        """Запрос страницы к API, разбор и сохранение прочитанных элементов в page_cache"""
+        cache_key = (query, page, rows)
+        response = self._make_request(query, page, rows, stream=True, lane=lane)
+        if not response:
+            return None, {}
+        
+        # Парсинг ответа в колонки; фильтры возраста и новизны
+        # считаются по ID и времени до извлечения остальных полей
+        try:
+            batch, stats = self._parse_response_debug(
+                response, query, watermark, max_age_minutes=max_age_minutes, only_new=only_new
+            )
+        except Exception as e:
+            # Обрыв потока (ChunkedEncodingError) или битый элемент - как неудачный запрос
+            print(f"❌ Ошибка чтения ответа: {e}")
+            return None, {}
+        finally:
+            # Соединение возвращается в пул при любом исходе разбора
+            if isinstance(response, ResultListStream):
+                response.close()
+        
+        if isinstance(response, ResultListStream):
+            page_cache.put(cache_key, response.items, complete=response.exhausted)
+        else:
+            page_cache.put(cache_key, response.get('data', {}).get('resultList', []), complete=True)
+        
+        return batch, stats
+    
+    def _parse_response_debug(self, api_response: Union[Dict, ResultListStream], query: str,
+                              watermark: Optional[Dict] = None,
+                              max_age_minutes: float = None,
+                              only_new: bool = False) -> Tuple[ProductBatch, Dict]:
+        """Парсинг ответа с ДЕТАЛЬНОЙ диагностикой в колоночную партию товаров
+
+        Парсинг в две фазы: сначала для каждого элемента извлекаются только
+        ID и время публикации, по ним считаются фильтры возраста и уже
+        просмотренных товаров (маской по странице), и только для оставшихся
+        извлекаются название, цена, местоположение и фото.
+
+        Если передан watermark запроса, парсинг останавливается на первых
+        товарах, которые не новее прошлой проверки (выдача отсортирована по новизне).
+        Так же останавливается на товарах старше max_age_minutes. Для потока
+        (ResultListStream) остановка закрывает ответ - остаток тела не читается.
+        """
         stats = {
             'total_api_items': 0,
             'valid_items': 0,
             'invalid_items': 0,
             'filtered_by_query': 0,
+            'filtered_by_age': 0,
+            'filtered_by_seen': 0,
+            'oldest_age_minutes': None,
+            'newest_publish_time': None,
+            'newest_ids': [],
+            'watermark_reached': False,
+            'age_limit_reached': False,
             'invalid_reasons': {
                 'no_data': 0,
                 'no_id': 0,
@@ -237,43 +424,40 @@ class GoofishParser:
         }
         
         if not api_response:
-            return products, stats
+            return ProductBatch.empty(), stats
         
-        data = api_response.get('data', {})
-        result_list = data.get('resultList', [])
-        stats['total_api_items'] = len(result_list)
+        # Индекс страницы для перекрестных ссылок exContent (строится при первой необходимости)
+        if isinstance(api_response, ResultListStream):
+            result_list = api_response
+            # Ссылка на элемент дальше по странице дочитывает поток до него
+            item_index = LazyItemIndex(api_response.items, fill=api_response.fetch_more)
+            items_label = "ПОТОКОВЫЙ"
+        else:
+            result_list = api_response.get('data', {}).get('resultList', [])
+            item_index = LazyItemIndex(result_list)
+            items_label = str(len(result_list))
+
+        behind_watermark = 0
+        beyond_age = 0
+        
+        # Запрос и названия сравниваются в каноническом виде (регистр, ширина, иероглифы)
+        from bot.parser_settings import parser_settings
+        filter_by_query = parser_settings.get('filter_by_query', True)
+        query_key = normalize_text(query) if query else ''
+
+        print(f"\n🔍 АНАЛИЗ {items_label} ЭЛЕМЕНТОВ API:")
         
-        print(f"\n🔍 АНАЛИЗ {len(result_list)} ЭЛЕМЕНТОВ API:")
+        # ===== Фаза 1: только ID и время публикации =====
+        candidates = []  # (номер элемента, элемент, данные, путь к данным)
+        candidate_ids = []
+        candidate_ages = []
+        candidate_times = []
+        current_time_ms = time.time() * 1000
         
+        i = -1
         for i, item in enumerate(result_list):
             try:
-                # Пробуем разные пути к данным
-                item_data = None
-                data_path = ""
-                
-                # Путь 1: Основной
-                item_data = item.get('data', {}).get('item', {}).get('main', {}).get('clickParam', {}).get('args', {})
-                if item_data:
-                    data_path = "main.clickParam.args"
-                
-                # Путь 2: Альтернативный (через exContent)
-                if not item_data:
-                    ex_content = item.get('data', {}).get('item', {}).get('main', {}).get('exContent', {})
-                    if ex_content:
-                        item_id = ex_content.get('itemId', '')
-                        # Ищем соответствующий элемент с args
-                        for elem in result_list:
-                            args = elem.get('data', {}).get('item', {}).get('main', {}).get('clickParam', {}).get('args', {})
-                            if args.get('id') == item_id:
-                                item_data = args
-                                data_path = "exContent cross-reference"
-                                break
-                
-                # Путь 3: Прямой доступ к данным
-                if not item_data:
-                    item_data = item.get('data', {}).get('item', {})
-                    if item_data:
-                        data_path = "data.item"
+                item_data, data_path = item_plan.resolve_data(item, item_index)
                 
                 # Если вообще нет данных
                 if not item_data:
@@ -285,8 +469,8 @@ class GoofishParser:
                     continue
                 
                 # Извлекаем ID
-                item_id = item_data.get('id', '')
-                if not item_id or item_id == 'None':
+                item_id = item_plan.get('id', item, item_data)
+                if not item_id:
                     stats['invalid_items'] += 1
                     stats['invalid_reasons']['no_id'] += 1
                     
@@ -294,25 +478,89 @@ class GoofishParser:
                         print(f"   {i:3d}. ❌ НЕТ ID. Путь: {data_path}")
                     continue
                 
-                # Извлекаем название
-                title = ""
+                # Время публикации (до фильтров - для ранней остановки пагинации)
+                publish_time_str = item_plan.get('publish_time', item, item_data)
+                publish_timestamp = None
+                age_minutes = 99999
                 
-                # Способ 1: Из detailParams
-                detail_params = item_data.get('detailParams', {})
-                if isinstance(detail_params, dict):
-                    title = detail_params.get('title', '')
+                if publish_time_str and publish_time_str != '0':
+                    try:
+                        publish_timestamp = int(publish_time_str)
+                        age_minutes = (current_time_ms - publish_timestamp) / (1000 * 60)
+                        stats['oldest_age_minutes'] = max(stats['oldest_age_minutes'] or 0, age_minutes)
+                    except:
+                        publish_timestamp = None
                 
-                # Способ 2: Из exContent
-                if not title:
-                    ex_content = item.get('data', {}).get('item', {}).get('main', {}).get('exContent', {})
-                    if ex_content:
-                        detail_params = ex_content.get('detailParams', {})
-                        if isinstance(detail_params, dict):
-                            title = detail_params.get('title', '')
+                # Watermark: всё, что не новее прошлой проверки, уже обработано
+                if publish_timestamp is not None and watermark:
+                    if self._is_behind_watermark(item_id, publish_timestamp, watermark):
+                        behind_watermark += 1
+                        if behind_watermark >= WATERMARK_GRACE_ITEMS:
+                            stats['watermark_reached'] = True
+                            print(f"   {i:3d}. 🔖 Достигнут watermark - остальные элементы пропущены")
+                            break
+                        continue
+                    behind_watermark = 0
                 
-                # Способ 3: Прямое поле title
-                if not title:
-                    title = item_data.get('title', '')
+                # Дальше только старше max_age_minutes (с тем же допуском, что и watermark)
+                if max_age_minutes is not None and publish_timestamp is not None:
+                    if age_minutes > max_age_minutes:
+                        beyond_age += 1
+                        if beyond_age >= WATERMARK_GRACE_ITEMS:
+                            stats['age_limit_reached'] = True
+                            print(f"   {i:3d}. ⏹️ Старше {max_age_minutes} мин - остальные элементы пропущены")
+                            break
+                    else:
+                        beyond_age = 0
+                
+                # Самые свежие товары страницы - кандидаты в новый watermark
+                if publish_timestamp is not None:
+                    newest = stats['newest_publish_time']
+                    if newest is None or publish_timestamp > newest:
+                        stats['newest_publish_time'] = publish_timestamp
+                        stats['newest_ids'] = [str(item_id)]
+                    elif publish_timestamp == newest:
+                        stats['newest_ids'].append(str(item_id))
+                
+                candidates.append((i, item, item_data, data_path))
+                candidate_ids.append(str(item_id))
+                candidate_ages.append(age_minutes)
+                candidate_times.append(publish_timestamp or 0)
+                
+            except Exception as e:
+                stats['invalid_items'] += 1
+                stats['invalid_reasons']['other'] += 1
+                
+                if i < 10:
+                    print(f"   {i:3d}. ⚠️ Ошибка парсинга: {e}")
+        
+        stats['total_api_items'] = i + 1  # Прочитано элементов (при остановке - до нее)
+        if isinstance(api_response, ResultListStream):
+            api_response.close()
+        
+        # ===== Фильтры возраста и новизны - маской по всей странице =====
+        projection = ProductBatch.projection(candidate_ids, candidate_ages, candidate_times)
+        keep = np.ones(len(projection), dtype=bool)
+        
+        if max_age_minutes is not None:
+            keep &= projection.age_mask(max_age_minutes)
+            stats['filtered_by_age'] = int(len(projection) - keep.sum())
+        
+        if only_new and keep.any():
+            seen = np.zeros(len(projection), dtype=bool)
+            seen[keep] = projection.select(keep).seen_mask(self.seen_ids)
+            stats['filtered_by_seen'] = int(seen.sum())
+            keep &= ~seen
+        
+        # ===== Фаза 2: полное извлечение только для оставшихся =====
+        builder = ProductBatchBuilder()
+        
+        for row in np.flatnonzero(keep):
+            i, item, item_data, data_path = candidates[row]
+            item_id = candidate_ids[row]
+            
+            try:
+                title = item_plan.get('title', item, item_data)
                 
                 if not title:
                     stats['invalid_items'] += 1
@@ -323,10 +571,7 @@ class GoofishParser:
                     continue
                 
                 # ФИЛЬТРАЦИЯ ПО ЗАПРОСУ (если включена в настройках)
-                from bot.parser_settings import parser_settings
-                filter_by_query = parser_settings.get('filter_by_query', True)
-                
-                if filter_by_query and query and query.lower() not in title.lower():
+                if filter_by_query and query_key and query_key not in normalize_text(title):
                     stats['invalid_items'] += 1
                     stats['invalid_reasons']['query_filter'] += 1
                     stats['filtered_by_query'] += 1
@@ -336,72 +581,25 @@ class GoofishParser:
                     continue
                 
                 # Извлекаем цену
-                price_str = item_data.get('price', '0')
-                try:
-                    price_clean = re.sub(r'[^\d\.]', '', price_str)
-                    price = float(price_clean) if price_clean else 0.0
-                except:
+                price = parse_price(item_plan.get('price', item, item_data) or '0')
+                if price is None:
                     price = 0.0
                     stats['invalid_reasons']['price_error'] += 1
                 
-                # Время публикации
-                publish_time_str = item_data.get('publishTime', '0')
-                age_minutes = 99999
-                
-                if publish_time_str and publish_time_str != '0':
-                    try:
-                        publish_timestamp = int(publish_time_str)
-                        current_time_ms = time.time() * 1000
-                        age_minutes = (current_time_ms - publish_timestamp) / (1000 * 60)
-                    except:
-                        pass
-                
-                # Локация
-                location = item_data.get('area', '')
-                if not location:
-                    ex_content = item.get('data', {}).get('item', {}).get('main', {}).get('exContent', {})
-                    if ex_content:
-                        location = ex_content.get('area', '')
-                
-                # ========== ИЗВЛЕЧЕНИЕ ФОТО ==========
-                images = []
-                
-                # Путь 1: Основной путь к фото
-                pic_url = item_data.get('picUrl', '')
-                if pic_url and pic_url.startswith('http'):
-                    images.append(pic_url)
+                location = item_plan.get('location', item, item_data) or ''
+                images = item_plan.images(item, item_data)
                 
-                # Путь 2: Альтернативный путь через pics
-                pics_list = item_data.get('pics', [])
-                if isinstance(pics_list, list) and pics_list:
-                    for pic in pics_list[:3]:  # Берем первые 3 фото
-                        if isinstance(pic, dict) and pic.get('picUrl'):
-                            img_url = pic['picUrl']
-                            if img_url.startswith('http') and img_url not in images:
-                                images.append(img_url)
-                
-                # Путь 3: Попробовать из exContent
-                if not images:
-                    ex_content = item.get('data', {}).get('item', {}).get('main', {}).get('exContent', {})
-                    if ex_content:
-                        pic_url = ex_content.get('picUrl', '')
-                        if pic_url and pic_url.startswith('http'):
-                            images.append(pic_url)
-                # =====================================
-                
-                # Создаем продукт
-                product = Product(
-                    id=item_id,
-                    title=title[:200],
-                    price=price,
-                    url=f"https://www.goofish.com/item?id={item_id}",
-                    location=location,
-                    age_minutes=round(age_minutes, 1),
-                    query=query,
-                    images=images  # <-- Добавляем фото!
+                # Строка партии (Product создается только для отправляемых товаров)
+                builder.append(
+                    item_id,
+                    title[:200],
+                    price,
+                    location,
+                    candidate_ages[row],
+                    query,
+                    images,
+                    candidate_times[row]
                 )
-                
-                products.append(product)
                 stats['valid_items'] += 1
                 
                 # Выводим первые 20 товаров для примера
@@ -430,11 +628,20 @@ class GoofishParser:
                 }.get(reason, reason)
                 print(f"   • {reason_text}: {count}")
         
-        return products, stats
+        # Накопленные счетчики путей извлечения (какие пути схемы реально срабатывают)
+        stats['extraction_paths'] = item_plan.stats()
+        
+        return builder.build(), stats
     
-    def _filter_new_products(self, products: List[Product]) -> List[Product]:
-        """Фильтрация только новых товаров"""
-        return [p for p in products if p.id not in self.seen_ids]
+    @staticmethod
+    def _is_behind_watermark(item_id: str, publish_timestamp: int, watermark: Dict) -> bool:
+        """Товар не новее watermark (старше или тот же момент и уже видели)"""
+        wm_time = watermark.get('publish_time')
+        if wm_time is None:
+            return False
+        if publish_timestamp < wm_time:
+            return True
+        return publish_timestamp == wm_time and str(item_id) in watermark.get('ids', [])
     
     def check_cookies(self) -> Tuple[bool, str]:
         """Проверка валидности cookies"""
@@ -473,4 +680,21 @@ class GoofishParser:
         # Процент успеха
         if self.stats['total_api_items'] > 0:
             success_rate = (self.stats['valid_items'] / self.stats['total_api_items']) * 100
-            print(f"   📈 Эффективность парсинга: {success_rate:.1f}%")
\ No newline at end of file
+            print(f"   📈 Эффективность парсинга: {success_rate:.1f}%")
+        
+        item_plan.print_stats()
+
+# Общий парсер процесса: мониторинг и /search делят сессию, cookies и page_cache
+_shared_parser: Optional[GoofishParser] = None
+_shared_parser_lock = threading.Lock()
+
+
+def get_shared_parser() -> GoofishParser:
+    """Парсер, общий для процесса; cookies перечитываются, если файл обновился"""
+    global _shared_parser
+    with _shared_parser_lock:
+        if _shared_parser is None:
+            _shared_parser = GoofishParser()
+        elif _shared_parser.cookies_mtime != _shared_parser._cookies_file_mtime():
+            _shared_parser.reload_cookies()
+        return _shared_parser
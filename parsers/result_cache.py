@@ -0,0 +1,81 @@
+# parsers/result_cache.py - короткоживущий кэш страниц выдачи для /search и мониторинга
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from config import SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_PAGES
+
+
+class PageResultCache:
+    """Элементы resultList по ключу (query, page, rows) с TTL и вытеснением LRU
+
+    Хранится прочитанный префикс страницы и признак, что он полный. Полная
+    страница подходит любому вызову; префикс (поток был остановлен по
+    watermark или возрасту) - только тому, чей разбор остановится внутри
+    него же, иначе страница запрашивается заново. Фильтры (новизна,
+    возраст, watermark) каждый вызов применяет к элементам сам, поэтому
+    /search, мониторинг и кнопки листания делят одни и те же записи.
+
+    TTL не больше половины интервала мониторинга (limit_ttl): иначе цикл
+    прочитал бы из кэша собственную страницу прошлого цикла и сдвинул
+    watermark по устаревшему снимку выдачи.
+    """
+
+    def __init__(self, ttl: float = SEARCH_CACHE_TTL, max_pages: int = SEARCH_CACHE_MAX_PAGES):
+        self.max_ttl = ttl
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[Dict], bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[List[Dict], bool]]:
+        """(элементы, страница полная) или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: Hashable, items: List[Dict], complete: bool):
+        with self._lock:
+            old = self._entries.get(key)
+            # Неполный префикс не заменяет более свежую полную страницу
+            if old is not None and old[2] and not complete and time.monotonic() - old[0] <= self.ttl:
+                return
+            self._entries[key] = (time.monotonic(), items, complete)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_pages:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def limit_ttl(self, check_interval: float):
+        """TTL по интервалу проверки мониторинга: min(SEARCH_CACHE_TTL, интервал / 2)"""
+        ttl = min(self.max_ttl, max(0.0, check_interval) / 2)
+        if ttl != self.ttl:
+            print(f"⚡ TTL кэша страниц: {ttl:g} с (интервал проверки {check_interval} с)")
+            self.ttl = ttl
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'pages': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+# Один кэш на процесс
+page_cache = PageResultCache()
@@ -0,0 +1,225 @@
+# parsers/stream.py - потоковый разбор data.resultList без декодирования всего ответа
+import codecs
+import re
+from typing import AsyncIterable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from parsers.extract import build_item_index, get_click_args, get_ex_content
+from utils import jsoncodec
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_RESULT_LIST_KEY = '"resultList"'
+
+
+class ResultListDecoder:
+    """Инкрементальный декодер: feed(фрагмент тела) -> готовые элементы resultList
+
+    Пока ключ "resultList" не встретился, текст копится целиком - ответы без
+    выдачи (RGV587_ERROR, ошибки токена) маленькие и разбираются обычным
+    jsoncodec.loads в finish(). После ключа каждый элемент массива декодируется
+    jsoncodec.raw_decode (всегда стандартный json), как только он пришел полностью,
+    а прочитанная часть буфера отбрасывается - в памяти не больше одного фрагмента
+    и одного элемента.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._scan_from = 0
+        self._expect_value = True
+        self.found = False  # Ключ resultList найден, дальше идут элементы
+        self.done = False  # Массив закрыт - остаток тела не нужен
+        self.items_decoded = 0
+
+    def feed(self, chunk: Union[bytes, str]) -> List[Dict]:
+        if self.done:
+            return []
+        self._buf += self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+        if not self.found and not self._find_array():
+            return []
+        return self._decode_items()
+
+    def _find_array(self) -> bool:
+        """Ищет 'resultList' : [ и ставит позицию на первый элемент"""
+        key_pos = self._buf.find(_RESULT_LIST_KEY, self._scan_from)
+        if key_pos < 0:
+            # Ключ может быть разрезан границей фрагмента
+            self._scan_from = max(0, len(self._buf) - len(_RESULT_LIST_KEY))
+            return False
+
+        pos = _WHITESPACE.match(self._buf, key_pos + len(_RESULT_LIST_KEY)).end()
+        if pos >= len(self._buf):
+            return False
+        if self._buf[pos] != ':':  # Строка "resultList" внутри значения, а не ключ
+            self._scan_from = key_pos + 1
+            return self._find_array()
+
+        pos = _WHITESPACE.match(self._buf, pos + 1).end()
+        if pos >= len(self._buf):
+            return False
+        if self._buf[pos] != '[':  # resultList: null и подобное - выдачи нет
+            self._scan_from = key_pos + 1
+            return self._find_array()
+
+        self.found = True
+        self._buf = self._buf[pos + 1:]
+        return True
+
+    def _decode_items(self) -> List[Dict]:
+        items = []
+        buf = self._buf
+        pos = 0
+
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+
+            if self._expect_value:
+                if buf[pos] == ']' and not self.items_decoded and not items:
+                    self.done = True
+                    break
+                try:
+                    item, pos = jsoncodec.raw_decode(buf, pos)
+                except jsoncodec.JSONDecodeError:
+                    break  # Элемент пришел не полностью - ждем следующий фрагмент
+                items.append(item)
+                self._expect_value = False
+            elif buf[pos] == ',':
+                pos += 1
+                self._expect_value = True
+            elif buf[pos] == ']':
+                self.done = True
+                break
+            else:
+                raise ValueError(f"Неожиданный символ в resultList: {buf[pos]!r}")
+
+        # Прочитанное отбрасываем, незавершенный элемент остается в буфере
+        self._buf = buf[pos:]
+        self.items_decoded += len(items)
+        return items
+
+    def finish(self) -> Optional[Dict]:
+        """Полный разбор ответа, в котором resultList не нашелся"""
+        if self.found:
+            return None
+        self._buf += self._utf8.decode(b'', final=True)
+        return jsoncodec.loads(self._buf) if self._buf.strip() else None
+
+
+class ResultListStream:
+    """Элементы resultList по мере чтения тела ответа
+
+    Итерацию можно прервать (watermark, возраст) - close() закрывает ответ,
+    и остаток тела не скачивается и не декодируется. В items копятся все
+    декодированные элементы, включая прочитанные вперед через fetch_more()
+    (для перекрестных ссылок exContent на элементы дальше по странице).
+    """
+
+    def __init__(self, chunks: Iterator[bytes], decoder: ResultListDecoder,
+                 pending: List[Dict], on_close: Callable = None):
+        self._chunks = chunks
+        self._decoder = decoder
+        self._on_close = on_close
+        self._next = 0
+        self.items: List[Dict] = list(pending)
+        self.closed = False
+
+    @classmethod
+    def open(cls, chunks: Iterable[bytes], on_close: Callable = None) -> Union['ResultListStream', Dict, None]:
+        """Поток, если в ответе есть resultList, иначе полностью разобранный ответ"""
+        decoder = ResultListDecoder()
+        chunks = iter(chunks)
+
+        try:
+            for chunk in chunks:
+                pending = decoder.feed(chunk)
+                if decoder.found:
+                    return cls(chunks, decoder, pending, on_close)
+        except BaseException:
+            # Обрыв соединения или битый ответ - соединение не остается занятым
+            if on_close:
+                on_close()
+            raise
+
+        if on_close:
+            on_close()
+        return decoder.finish()
+
+    @property
+    def exhausted(self) -> bool:
+        """Прочитан весь массив (а не прерван по условию остановки)"""
+        return self._decoder.done
+
+    def fetch_more(self) -> bool:
+        """Дочитывает тело до следующих элементов; False - больше элементов нет"""
+        while not self._decoder.done and not self.closed:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            items = self._decoder.feed(chunk)
+            if items:
+                self.items.extend(items)
+                return True
+        return False
+
+    def __iter__(self) -> Iterator[Dict]:
+        while self._next < len(self.items) or self.fetch_more():
+            item = self.items[self._next]
+            self._next += 1
+            yield item
+
+        self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            if self._on_close:
+                self._on_close()
+
+
+def _cross_reference_ids(items: List[Dict]) -> Set[str]:
+    """ID, на которые ссылаются элементы без clickParam.args (exContent.itemId)"""
+    ids = set()
+    for item in items:
+        if get_click_args(item):
+            continue
+        item_id = get_ex_content(item).get('itemId')
+        if item_id not in (None, '', 'None'):
+            ids.add(str(item_id))
+    return ids
+
+
+async def collect_result_list(chunks: AsyncIterable[bytes], max_items: int = None) -> Optional[Dict]:
+    """Асинхронное чтение ответа, пока не прочитаны первые max_items элементов resultList
+
+    Если среди них есть перекрестные ссылки exContent на элементы дальше по
+    странице, чтение продолжается, пока все они не найдутся (или массив не
+    закончится). Возвращает {'data': {'resultList': [...]}, 'streamed': True}
+    со всеми прочитанными элементами, если выдача найдена (остаток тела не
+    читается), иначе полностью разобранный ответ.
+    """
+    decoder = ResultListDecoder()
+    items: List[Dict] = []
+    wanted: Optional[Set[str]] = None  # Ссылки первых max_items элементов
+    available: Set[str] = set()  # ID, по которым элементы уже есть в индексе
+
+    async for chunk in chunks:
+        new_items = decoder.feed(chunk)
+        items.extend(new_items)
+        if decoder.done:
+            break
+        if not max_items or len(items) < max_items:
+            continue
+
+        if wanted is None:
+            wanted = _cross_reference_ids(items[:max_items])
+            available.update(build_item_index(items))
+        else:
+            available.update(build_item_index(new_items))
+        if wanted <= available:
+            break
+
+    if decoder.found:
+        return {'data': {'resultList': items}, 'streamed': True}
+    return decoder.finish()
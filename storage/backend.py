@@ -0,0 +1,25 @@
+# storage/backend.py - выбор хранилища по STORAGE_BACKEND (files или sqlite)
+from config import STORAGE_BACKEND
+
+if STORAGE_BACKEND == "sqlite":
+    from storage.db import (
+        load_search_queries, save_search_queries, add_search_query,
+        seen_ids_store, load_seen_ids, save_seen_ids, add_seen_ids,
+        load_watermarks, get_query_watermark, save_query_watermark, watermark_batch,
+        load_users, save_user,
+        load_subscriptions, load_subscription_index,
+        get_user_queries, save_user_queries,
+        add_user_query, remove_user_query, clear_user_queries,
+        save_json, load_json
+    )
+else:
+    from storage.files import (
+        load_search_queries, save_search_queries, add_search_query,
+        seen_ids_store, load_seen_ids, save_seen_ids, add_seen_ids,
+        load_watermarks, get_query_watermark, save_query_watermark, watermark_batch,
+        load_users, save_user,
+        load_subscriptions, load_subscription_index,
+        get_user_queries, save_user_queries,
+        add_user_query, remove_user_query, clear_user_queries,
+        save_json, load_json
+    )
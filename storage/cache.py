@@ -0,0 +1,70 @@
+# storage/cache.py - кэш JSON-файлов в памяти со сквозной записью
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+from utils import jsoncodec
+
+
+class CachedJsonFile:
+    """JSON-файл, прочитанный один раз и хранимый в памяти
+
+    Чтение отдает данные из памяти; файл перечитывается, только если его
+    изменил кто-то другой (по mtime и размеру - это один stat без разбора
+    JSON). Запись идет через кэш: данные сохраняются на диск и сразу
+    становятся новым содержимым кэша.
+    """
+
+    def __init__(self, path: Path, default_factory: Callable[[], Any] = dict,
+                 on_load: Optional[Callable[[Any], None]] = None):
+        self.path = Path(path)
+        self.default_factory = default_factory
+        self.on_load = on_load  # Вызывается после каждого чтения файла с диска
+        self._data = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+        self.loads = 0  # Сколько раз файл реально читался с диска
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def get(self) -> Any:
+        """Данные файла (не изменять - для изменения используйте set)"""
+        with self._lock:
+            stamp = self._file_stamp()
+            if self._data is None or stamp != self._stamp:
+                self._data = self._read()
+                self._stamp = stamp
+                self.loads += 1
+                if self.on_load:
+                    self.on_load(self._data)
+            return self._data
+
+    def _read(self) -> Any:
+        if not self.path.exists():
+            return self.default_factory()
+        try:
+            with open(self.path, 'rb') as f:
+                return jsoncodec.load(f)
+        except Exception:
+            return self.default_factory()
+
+    def set(self, data: Any):
+        """Запись на диск и замена содержимого кэша"""
+        with self._lock:
+            self.path.parent.mkdir(exist_ok=True)
+            with open(self.path, 'wb') as f:
+                jsoncodec.dump(data, f)
+            self._data = data
+            self._stamp = self._file_stamp()
+
+    def invalidate(self):
+        """Сброс кэша: следующее чтение пойдет на диск"""
+        with self._lock:
+            self._data = None
+            self._stamp = None
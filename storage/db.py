@@ -0,0 +1,388 @@
+# storage/db.py - SQLite-хранилище (WAL) с тем же набором функций, что storage/files.py
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import (
+    DB_FILE, USERS_FILE, SUBSCRIPTIONS_FILE, SEEN_IDS_FILE, SEEN_IDS_JOURNAL_FILE,
+    WATERMARKS_FILE, SEEN_IDS_RETENTION_MINUTES
+)
+# Общие запросы остаются в текстовом файле (его удобно править руками)
+from storage.files import (
+    load_search_queries, save_search_queries, add_search_query,
+    save_json, load_json
+)
+from storage.seen_ids import SeenIdsStore
+from storage.subscription_index import SubscriptionIndex
+from utils import jsoncodec
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id      INTEGER PRIMARY KEY,
+    data    TEXT NOT NULL
+);
+
+-- Пользователи с персональным списком запросов (даже пустым):
+-- остальные получают общие запросы, как в storage/files.py
+CREATE TABLE IF NOT EXISTS subscribers (
+    user_id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    user_id  INTEGER NOT NULL,
+    query    TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (user_id, query)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_subscriptions_query ON subscriptions (query);
+
+CREATE TABLE IF NOT EXISTS seen_ids (
+    id         TEXT PRIMARY KEY,
+    first_seen INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_seen_ids_first_seen ON seen_ids (first_seen);
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    query        TEXT PRIMARY KEY,
+    publish_time INTEGER NOT NULL,
+    ids          TEXT NOT NULL
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def get_connection() -> sqlite3.Connection:
+    """Соединение текущего потока (монитор, бот и пул парсера работают в разных потоках)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        _local.conn = conn
+        _ensure_schema(conn)
+    return conn
+
+
+def _ensure_schema(conn: sqlite3.Connection):
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        is_new = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+        ).fetchone()
+        conn.executescript(SCHEMA)
+        _initialized = True
+
+    if is_new:
+        migrate_from_json(conn)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT: одна транзакция на пакет изменений"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def transaction() -> _Transaction:
+    return _Transaction(get_connection())
+
+# ==================== Управление просмотренными ID ====================
+
+class SqliteSeenIds:
+    """Просмотренные ID в таблице seen_ids - общие для всех процессов"""
+
+    def __init__(self, retention_minutes: Optional[float] = None, sweep_interval: float = 3600):
+        self.retention_minutes = retention_minutes
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+
+    def __contains__(self, item_id) -> bool:
+        row = get_connection().execute(
+            "SELECT 1 FROM seen_ids WHERE id = ?", (str(item_id),)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return get_connection().execute("SELECT COUNT(*) FROM seen_ids").fetchone()[0]
+
+    def snapshot(self) -> Set[str]:
+        return {row[0] for row in get_connection().execute("SELECT id FROM seen_ids")}
+
+    def add(self, ids: Iterable[str]) -> int:
+        now = int(time.time())
+        rows = [(str(item_id), now) for item_id in ids]
+        if not rows:
+            return 0
+
+        with transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO seen_ids (id, first_seen) VALUES (?, ?)", rows)
+            added = conn.total_changes - before
+
+        if self.retention_minutes and time.time() - self._last_sweep >= self.sweep_interval:
+            self.expire()
+        return added
+
+    def add_with_times(self, rows: Iterable) -> int:
+        """Пакетная вставка пар (ID, время первого появления) - для миграции"""
+        with transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO seen_ids (id, first_seen) VALUES (?, ?)", rows)
+            return conn.total_changes - before
+
+    def expire(self, now: float = None) -> int:
+        now = now or time.time()
+        self._last_sweep = now
+        if not self.retention_minutes:
+            return 0
+
+        cutoff = int(now - self.retention_minutes * 60)
+        with transaction() as conn:
+            removed = conn.execute("DELETE FROM seen_ids WHERE first_seen < ?", (cutoff,)).rowcount
+
+        if removed:
+            print(f"🧹 seen_ids: удалено {removed} устаревших ID")
+        return removed
+
+    def replace(self, ids: Iterable[str]):
+        now = int(time.time())
+        with transaction() as conn:
+            conn.execute("DELETE FROM seen_ids")
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_ids (id, first_seen) VALUES (?, ?)",
+                ((str(item_id), now) for item_id in ids)
+            )
+
+    def compact(self):
+        """Сжатие не требуется - WAL сбрасывается SQLite автоматически"""
+        get_connection().execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+seen_ids_store = SqliteSeenIds(retention_minutes=SEEN_IDS_RETENTION_MINUTES)
+
+def load_seen_ids() -> Set[str]:
+    """Загрузка ID просмотренных товаров"""
+    return seen_ids_store.snapshot()
+
+def save_seen_ids(seen_ids: Set[str]):
+    """Сохранение ID просмотренных товаров"""
+    seen_ids_store.replace(seen_ids)
+
+def add_seen_ids(new_ids: List[str]):
+    """Добавление новых ID в кэш"""
+    return seen_ids_store.add(new_ids)
+
+# ==================== Watermark запросов ====================
+
+def load_watermarks() -> Dict:
+    """Загрузка watermark всех запросов: запрос -> {'publish_time', 'ids'}"""
+    rows = get_connection().execute("SELECT query, publish_time, ids FROM watermarks")
+    return {query: {'publish_time': publish_time, 'ids': jsoncodec.loads(ids)}
+            for query, publish_time, ids in rows}
+
+def get_query_watermark(query: str) -> Dict:
+    """Watermark запроса: время самого свежего товара и ID товаров с этим временем"""
+    row = get_connection().execute(
+        "SELECT publish_time, ids FROM watermarks WHERE query = ?", (query,)
+    ).fetchone()
+    if not row:
+        return {}
+    return {'publish_time': row[0], 'ids': jsoncodec.loads(row[1])}
+
+def save_query_watermark(query: str, publish_time: int, ids: List[str]) -> bool:
+    """Сдвиг watermark запроса вперед (назад не сдвигается)"""
+    try:
+        with transaction() as conn:
+            row = conn.execute(
+                "SELECT publish_time, ids FROM watermarks WHERE query = ?", (query,)
+            ).fetchone()
+
+            if row and publish_time < row[0]:
+                return False
+            if row and publish_time == row[0]:
+                ids = sorted(set(jsoncodec.loads(row[1])) | set(ids))
+
+            conn.execute(
+                "INSERT OR REPLACE INTO watermarks (query, publish_time, ids) VALUES (?, ?, ?)",
+                (query, publish_time, jsoncodec.dumps(list(ids), pretty=False))
+            )
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка сохранения watermark: {e}")
+        return False
+
+@contextmanager
+def watermark_batch():
+    """Совместимость с storage/files.py: здесь каждый сдвиг - запись одной строки"""
+    yield
+
+# ==================== Управление пользователями ====================
+
+def load_users() -> Dict:
+    """Загрузка пользователей"""
+    rows = get_connection().execute("SELECT id, data FROM users ORDER BY rowid")
+    return {str(user_id): jsoncodec.loads(data) for user_id, data in rows}
+
+def save_user(user_data: Dict):
+    """Сохранение пользователя"""
+    try:
+        with transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO users (id, data) VALUES (?, ?)",
+                (int(user_data['id']), jsoncodec.dumps(user_data, pretty=False))
+            )
+    except Exception as e:
+        print(f"❌ Ошибка сохранения пользователя: {e}")
+
+# ==================== Управление подписками ====================
+
+def load_subscriptions() -> Dict:
+    """Загрузка подписок (персональных запросов)"""
+    conn = get_connection()
+    subscriptions = {str(row[0]): [] for row in conn.execute("SELECT user_id FROM subscribers")}
+    rows = conn.execute("SELECT user_id, query FROM subscriptions ORDER BY user_id, position")
+    for user_id, query in rows:
+        subscriptions.setdefault(str(user_id), []).append(query)
+    return subscriptions
+
+def load_subscription_index() -> SubscriptionIndex:
+    """Обратный индекс подписок (только для чтения)"""
+    conn = get_connection()
+    index = SubscriptionIndex()
+    index.rebuild({row[0]: [] for row in conn.execute("SELECT user_id FROM subscribers")})
+    for query, user_id in conn.execute("SELECT query, user_id FROM subscriptions"):
+        index.set_user_queries(user_id, (), (query,))
+    return index
+
+def get_user_queries(user_id: int) -> List[str]:
+    """Получение запросов конкретного пользователя"""
+    conn = get_connection()
+    
+    # Если у пользователя есть персональные запросы - возвращаем их
+    if conn.execute("SELECT 1 FROM subscribers WHERE user_id = ?", (int(user_id),)).fetchone():
+        rows = conn.execute(
+            "SELECT query FROM subscriptions WHERE user_id = ? ORDER BY position", (int(user_id),)
+        )
+        return [row[0] for row in rows]
+    
+    # Если нет - возвращаем глобальные запросы
+    return load_search_queries()
+
+def save_user_queries(user_id: int, queries: List[str]):
+    """Сохранение запросов пользователя"""
+    try:
+        with transaction() as conn:
+            _replace_user_queries(conn, int(user_id), queries)
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка сохранения запросов пользователя: {e}")
+        return False
+
+def _replace_user_queries(conn: sqlite3.Connection, user_id: int, queries: List[str]):
+    conn.execute("INSERT OR IGNORE INTO subscribers (user_id) VALUES (?)", (user_id,))
+    conn.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO subscriptions (user_id, query, position) VALUES (?, ?, ?)",
+        [(user_id, query, position) for position, query in enumerate(queries)]
+    )
+
+def add_user_query(user_id: int, query: str) -> bool:
+    """Добавление запроса пользователю"""
+    queries = get_user_queries(user_id)
+    if query not in queries:
+        queries.append(query)
+        return save_user_queries(user_id, queries)
+    return False
+
+def remove_user_query(user_id: int, query: str) -> bool:
+    """Удаление запроса у пользователя"""
+    queries = get_user_queries(user_id)
+    if query in queries:
+        queries.remove(query)
+        return save_user_queries(user_id, queries)
+    return False
+
+def clear_user_queries(user_id: int) -> bool:
+    """Очистка всех запросов пользователя"""
+    try:
+        with transaction() as conn:
+            existed = conn.execute(
+                "DELETE FROM subscribers WHERE user_id = ?", (int(user_id),)
+            ).rowcount
+            conn.execute("DELETE FROM subscriptions WHERE user_id = ?", (int(user_id),))
+        return existed > 0
+    except Exception as e:
+        print(f"❌ Ошибка очистки запросов пользователя: {e}")
+        return False
+
+# ==================== Миграция из JSON ====================
+
+def migrate_from_json(conn: sqlite3.Connection = None) -> Dict[str, int]:
+    """Однократный перенос users.json, subscriptions.json, seen_ids и watermarks.json в SQLite"""
+    conn = conn or get_connection()
+    stats = {'users': 0, 'subscriptions': 0, 'seen_ids': 0, 'watermarks': 0}
+
+    users = load_json(USERS_FILE, {})
+    subscriptions = load_json(SUBSCRIPTIONS_FILE, {})
+    watermarks = load_json(WATERMARKS_FILE, {})
+    seen_rows = SeenIdsStore(SEEN_IDS_FILE, SEEN_IDS_JOURNAL_FILE).items()
+
+    if not (users or subscriptions or watermarks or seen_rows):
+        return stats
+
+    print(f"📦 Миграция JSON → {DB_FILE.name}...")
+
+    with _Transaction(conn):
+        for user_id, user_data in users.items():
+            conn.execute(
+                "INSERT OR REPLACE INTO users (id, data) VALUES (?, ?)",
+                (int(user_id), jsoncodec.dumps(user_data, pretty=False))
+            )
+            stats['users'] += 1
+
+        for user_id, queries in subscriptions.items():
+            _replace_user_queries(conn, int(user_id), queries)
+            stats['subscriptions'] += len(queries)
+
+        for query, watermark in watermarks.items():
+            conn.execute(
+                "INSERT OR REPLACE INTO watermarks (query, publish_time, ids) VALUES (?, ?, ?)",
+                (query, watermark['publish_time'], jsoncodec.dumps(watermark.get('ids', []), pretty=False))
+            )
+            stats['watermarks'] += 1
+
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO seen_ids (id, first_seen) VALUES (?, ?)", seen_rows)
+        stats['seen_ids'] = conn.total_changes - before
+
+    print(f"✅ Миграция завершена: пользователей {stats['users']}, подписок {stats['subscriptions']}, "
+          f"seen_ids {stats['seen_ids']}, watermark {stats['watermarks']}")
+    return stats
+
+
+if __name__ == "__main__":
+    # python storage/db.py migrate - повторный перенос JSON в существующую базу
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        migrate_from_json()
+    else:
+        print("Использование: python storage/db.py migrate")
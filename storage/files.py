@@ -1,11 +1,18 @@
 # storage/files.py
-import json
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 from config import (
     SEARCH_QUERIES_FILE, USERS_FILE, SUBSCRIPTIONS_FILE, 
-    SEEN_IDS_FILE, DEFAULT_QUERIES, DATA_DIR
+    SEEN_IDS_FILE, DEFAULT_QUERIES, DATA_DIR, WATERMARKS_FILE,
+    SEEN_IDS_JOURNAL_FILE, SEEN_IDS_COMPACT_EVERY, SEEN_IDS_RETENTION_MINUTES,
+    SEEN_IDS_BACKEND, SEEN_IDS_INDEX_FILE, SEEN_IDS_MERGE_EVERY
 )
+from storage.seen_ids import SeenIdsStore
+from storage.seen_index import MmapSeenIndex
+from storage.cache import CachedJsonFile
+from storage.subscription_index import SubscriptionIndex
+from utils import jsoncodec
 
 # ==================== Управление поисковыми запросами ====================
 
@@ -50,47 +57,113 @@ def add_search_query(query: str):
 
 # ==================== Управление просмотренными ID ====================
 
+def _create_seen_ids_store():
+    """Хранилище seen_ids по SEEN_IDS_BACKEND"""
+    if SEEN_IDS_BACKEND == 'mmap':
+        # Отсортированные uint64 в mmap-файле (см. storage/seen_index.py)
+        return MmapSeenIndex(
+            SEEN_IDS_INDEX_FILE, SEEN_IDS_JOURNAL_FILE,
+            merge_every=SEEN_IDS_MERGE_EVERY,
+            retention_minutes=SEEN_IDS_RETENTION_MINUTES,
+            legacy_file=SEEN_IDS_FILE
+        )
+    
+    # Множество в памяти + журнал добавлений (см. storage/seen_ids.py)
+    return SeenIdsStore(
+        SEEN_IDS_FILE, SEEN_IDS_JOURNAL_FILE,
+        compact_every=SEEN_IDS_COMPACT_EVERY,
+        retention_minutes=SEEN_IDS_RETENTION_MINUTES
+    )
+
+seen_ids_store = _create_seen_ids_store()
+
 def load_seen_ids() -> Set[str]:
     """Загрузка ID просмотренных товаров"""
-    if not SEEN_IDS_FILE.exists():
-        return set()
-    
-    try:
-        with open(SEEN_IDS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return set(data.get('seen_ids', []))
-    except:
-        return set()
+    return seen_ids_store.snapshot()
 
 def save_seen_ids(seen_ids: Set[str]):
     """Сохранение ID просмотренных товаров"""
-    try:
-        data = {'seen_ids': list(seen_ids)}
-        with open(SEEN_IDS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"❌ Ошибка сохранения seen_ids: {e}")
+    seen_ids_store.replace(seen_ids)
 
 def add_seen_ids(new_ids: List[str]):
     """Добавление новых ID в кэш"""
-    seen_ids = load_seen_ids()
-    before = len(seen_ids)
-    seen_ids.update(new_ids)
-    save_seen_ids(seen_ids)
-    return len(seen_ids) - before
+    return seen_ids_store.add(new_ids)
+
+# ==================== Watermark запросов ====================
+
+# Файл читается один раз; внутри watermark_batch сдвиги копятся в памяти
+# и пишутся на диск одной записью в конце блока
+_watermarks_cache = CachedJsonFile(WATERMARKS_FILE)
+_pending_watermarks: Optional[Dict] = None
+_batch_depth = 0
+
+def _current_watermarks() -> Dict:
+    return _pending_watermarks if _pending_watermarks is not None else _watermarks_cache.get()
+
+def load_watermarks() -> Dict:
+    """Загрузка watermark всех запросов: запрос -> {'publish_time', 'ids'}"""
+    return dict(_current_watermarks())
+
+def get_query_watermark(query: str) -> Dict:
+    """Watermark запроса: время самого свежего товара и ID товаров с этим временем"""
+    return _current_watermarks().get(query, {})
+
+def save_query_watermark(query: str, publish_time: int, ids: List[str]) -> bool:
+    """Сдвиг watermark запроса вперед (назад не сдвигается)"""
+    global _pending_watermarks
+    watermarks = _current_watermarks()
+    current = watermarks.get(query, {})
+    current_time = current.get('publish_time')
+    
+    if current_time is not None and publish_time < current_time:
+        return False
+    
+    if current_time == publish_time:
+        ids = sorted(set(current.get('ids', [])) | set(ids))
+    
+    if _pending_watermarks is None:
+        watermarks = dict(watermarks)  # Содержимое кэша не меняем на месте
+    watermarks[query] = {'publish_time': publish_time, 'ids': list(ids)}
+    
+    if _batch_depth:
+        _pending_watermarks = watermarks
+        return True
+    return _write_watermarks(watermarks)
+
+def _write_watermarks(watermarks: Dict) -> bool:
+    try:
+        _watermarks_cache.set(watermarks)
+        return True
+    except Exception as e:
+        _watermarks_cache.invalidate()
+        print(f"❌ Ошибка сохранения watermark: {e}")
+        return False
+
+@contextmanager
+def watermark_batch():
+    """Все сдвиги watermark внутри блока (цикл мониторинга) - одна запись файла"""
+    global _batch_depth, _pending_watermarks
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+        if not _batch_depth and _pending_watermarks is not None:
+            watermarks, _pending_watermarks = _pending_watermarks, None
+            _write_watermarks(watermarks)
 
 # ==================== Управление пользователями ====================
 
+# Файлы читаются один раз, дальше чтения идут из памяти
+_users_cache = CachedJsonFile(USERS_FILE)
+# Обратный индекс запрос -> пользователи; перестраивается при чтении файла
+# с диска, а при изменениях через функции ниже обновляется на месте
+_subscription_index = SubscriptionIndex()
+_subscriptions_cache = CachedJsonFile(SUBSCRIPTIONS_FILE, on_load=_subscription_index.rebuild)
+
 def load_users() -> Dict:
     """Загрузка пользователей"""
-    if not USERS_FILE.exists():
-        return {}
-    
-    try:
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return {}
+    return dict(_users_cache.get())
 
 def save_user(user_data: Dict):
     """Сохранение пользователя"""
@@ -99,45 +172,50 @@ def save_user(user_data: Dict):
     users[user_id] = user_data
     
     try:
-        with open(USERS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(users, f, ensure_ascii=False, indent=2)
+        _users_cache.set(users)
     except Exception as e:
+        _users_cache.invalidate()
         print(f"❌ Ошибка сохранения пользователя: {e}")
 
 # ==================== Управление подписками ====================
 
 def load_subscriptions() -> Dict:
     """Загрузка подписок (персональных запросов)"""
-    if not SUBSCRIPTIONS_FILE.exists():
-        return {}
-    
-    try:
-        with open(SUBSCRIPTIONS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
-    except:
-        return {}
+    return {user_key: list(queries) for user_key, queries in _subscriptions_cache.get().items()}
+
+def load_subscription_index() -> SubscriptionIndex:
+    """Обратный индекс подписок (только для чтения)"""
+    _subscriptions_cache.get()  # Перечитает файл, если его изменил другой процесс
+    return _subscription_index
 
 def get_user_queries(user_id: int) -> List[str]:
     """Получение запросов конкретного пользователя"""
-    subscriptions = load_subscriptions()
+    subscriptions = _subscriptions_cache.get()
     user_key = str(user_id)
     
     # Если у пользователя есть персональные запросы - возвращаем их
     if user_key in subscriptions:
-        return subscriptions[user_key]
+        return list(subscriptions[user_key])
     
     # Если нет - возвращаем глобальные запросы
     return load_search_queries()
 
+def _save_subscriptions(subscriptions: Dict):
+    try:
+        _subscriptions_cache.set(subscriptions)
+    except Exception:
+        _subscriptions_cache.invalidate()
+        raise
+
 def save_user_queries(user_id: int, queries: List[str]):
     """Сохранение запросов пользователя"""
     subscriptions = load_subscriptions()
-    subscriptions[str(user_id)] = queries
+    old_queries = subscriptions.get(str(user_id), [])
+    subscriptions[str(user_id)] = list(queries)
     
     try:
-        with open(SUBSCRIPTIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(subscriptions, f, ensure_ascii=False, indent=2)
+        _save_subscriptions(subscriptions)
+        _subscription_index.set_user_queries(user_id, old_queries, queries)
         return True
     except Exception as e:
         print(f"❌ Ошибка сохранения запросов пользователя: {e}")
@@ -165,11 +243,11 @@ def clear_user_queries(user_id: int) -> bool:
     user_key = str(user_id)
     
     if user_key in subscriptions:
-        del subscriptions[user_key]
+        old_queries = subscriptions.pop(user_key)
         
         try:
-            with open(SUBSCRIPTIONS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(subscriptions, f, ensure_ascii=False, indent=2)
+            _save_subscriptions(subscriptions)
+            _subscription_index.remove_user(user_id, old_queries)
             return True
         except Exception as e:
             print(f"❌ Ошибка очистки запросов пользователя: {e}")
@@ -181,8 +259,8 @@ def clear_user_queries(user_id: int) -> bool:
 def save_json(data, filepath: Path):
     """Универсальное сохранение JSON"""
     filepath.parent.mkdir(exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with open(filepath, 'wb') as f:
+        jsoncodec.dump(data, f)
 
 def load_json(filepath: Path, default=None):
     """Универсальная загрузка JSON"""
@@ -191,8 +269,8 @@ def load_json(filepath: Path, default=None):
     
     try:
         if filepath.exists():
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(filepath, 'rb') as f:
+                return jsoncodec.load(f)
     except:
         pass
     
@@ -0,0 +1,244 @@
+# storage/seen_ids.py - хранилище просмотренных ID: снапшот + журнал добавлений
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils import jsoncodec
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+BUCKET_SECONDS = 3600  # Точность времени появления ID в снапшоте
+
+
+class SeenIdsStore:
+    """Множество просмотренных ID в памяти с журналом на диске
+
+    Новые ID дописываются в конец журнала (одна строка - «ID<TAB>время»),
+    а не переписывают весь seen_ids.json. Когда журнал вырастает до
+    compact_every записей, множество целиком сохраняется в снапшот и журнал
+    обнуляется. При старте состояние восстанавливается как снапшот + журнал.
+
+    Для каждого ID хранится время первого появления (в снапшоте - с
+    точностью до часа, с округлением вверх). ID старше
+    retention_minutes удаляются: такой товар уже не пройдет фильтр по
+    возрасту, так что память и время загрузки не растут со временем работы.
+    """
+
+    def __init__(self, snapshot_file: Path, journal_file: Path, compact_every: int = 10000,
+                 retention_minutes: Optional[float] = None, sweep_interval: float = 3600):
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = Path(journal_file)
+        self.compact_every = compact_every
+        self.retention_minutes = retention_minutes
+        self.sweep_interval = sweep_interval  # Секунд между проходами очистки
+        self._ids: Dict[str, int] = {}
+        self._journal_size = 0
+        self._last_sweep = 0.0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # ---------- Загрузка ----------
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def load(self):
+        """Восстановление состояния: снапшот + воспроизведение журнала"""
+        with self._lock:
+            self._ids = self._read_snapshot()
+            self._journal_size = self._replay_journal(self._ids)
+            self._loaded = True
+            self._last_sweep = time.time()
+
+            if self._journal_size >= self.compact_every:
+                self.compact()
+
+    def _cutoff(self, now: float = None) -> float:
+        """Время, раньше которого ID считаются устаревшими"""
+        if not self.retention_minutes:
+            return 0
+        return (now or time.time()) - self.retention_minutes * 60
+
+    def _read_snapshot(self) -> Dict[str, int]:
+        if not self.snapshot_file.exists():
+            return {}
+
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                data = jsoncodec.load(f)
+        except Exception as e:
+            print(f"❌ Ошибка чтения снапшота seen_ids: {e}")
+            return {}
+
+        # Старый формат - список без времени: считаем, что ID увидены сейчас
+        if 'buckets' not in data:
+            return dict.fromkeys(map(str, data.get('seen_ids', [])), int(time.time()))
+
+        # Новый формат: ID сгруппированы по часу появления, устаревшие часы пропускаем целиком
+        ids = {}
+        cutoff = self._cutoff()
+        for bucket, bucket_ids in data['buckets'].items():
+            bucket = int(bucket)
+            if bucket >= cutoff:
+                ids.update(dict.fromkeys(bucket_ids, bucket))
+        return ids
+
+    def _replay_journal(self, ids: Dict[str, int]) -> int:
+        """Добавление ID из журнала в словарь, возвращает число записей журнала"""
+        if not self.journal_file.exists():
+            return 0
+
+        count = 0
+        now = int(time.time())
+        cutoff = self._cutoff()
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    item_id, _, ts = line.strip().partition('\t')
+                    if not item_id:
+                        continue
+                    count += 1
+                    try:
+                        ts = int(ts)
+                    except ValueError:
+                        ts = now  # Строка без времени или оборванная запись
+                    if ts >= cutoff:
+                        ids.setdefault(item_id, ts)
+        except Exception as e:
+            print(f"❌ Ошибка чтения журнала seen_ids: {e}")
+
+        return count
+
+    # ---------- Чтение ----------
+
+    def __contains__(self, item_id) -> bool:
+        self._ensure_loaded()
+        return item_id in self._ids
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._ids)
+
+    def snapshot(self) -> Set[str]:
+        """Копия множества ID"""
+        self._ensure_loaded()
+        with self._lock:
+            return set(self._ids)
+
+    def items(self) -> List[Tuple[str, int]]:
+        """Пары (ID, время первого появления)"""
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._ids.items())
+
+    # ---------- Запись ----------
+
+    def add(self, ids: Iterable[str]) -> int:
+        """Добавление ID: в память и в конец журнала. Возвращает число новых"""
+        self._ensure_loaded()
+
+        with self._lock:
+            now = int(time.time())
+            new_ids = []
+            for item_id in ids:
+                item_id = str(item_id)
+                if item_id not in self._ids:
+                    self._ids[item_id] = now
+                    new_ids.append(item_id)
+
+            if new_ids:
+                try:
+                    self.journal_file.parent.mkdir(exist_ok=True)
+                    with open(self.journal_file, 'a', encoding='utf-8') as f:
+                        self._lock_file(f)
+                        f.write(''.join(f"{item_id}\t{now}\n" for item_id in new_ids))
+                        f.flush()
+                except Exception as e:
+                    print(f"❌ Ошибка записи журнала seen_ids: {e}")
+
+                self._journal_size += len(new_ids)
+
+            if self.retention_minutes and time.time() - self._last_sweep >= self.sweep_interval:
+                if self.expire():
+                    self.compact()
+            elif self._journal_size >= self.compact_every:
+                self.compact()
+
+            return len(new_ids)
+
+    def expire(self, now: float = None) -> int:
+        """Удаление ID старше retention_minutes. Возвращает число удаленных"""
+        self._ensure_loaded()
+
+        with self._lock:
+            now = now or time.time()
+            self._last_sweep = now
+            cutoff = self._cutoff(now)
+            if not cutoff:
+                return 0
+
+            expired = [item_id for item_id, ts in self._ids.items() if ts < cutoff]
+            for item_id in expired:
+                del self._ids[item_id]
+
+            if expired:
+                print(f"🧹 seen_ids: удалено {len(expired)} устаревших ID, осталось {len(self._ids)}")
+            return len(expired)
+
+    def replace(self, ids: Iterable[str]):
+        """Полная замена множества (совместимость с save_seen_ids)"""
+        with self._lock:
+            now = int(time.time())
+            self._ids = {str(i): now for i in ids}
+            self._loaded = True
+            self._write_snapshot(truncate_journal=True)
+
+    def compact(self):
+        """Сохранение множества в снапшот и обнуление журнала"""
+        with self._lock:
+            self._write_snapshot(truncate_journal=True)
+
+    def _write_snapshot(self, truncate_journal: bool):
+        self.snapshot_file.parent.mkdir(exist_ok=True)
+
+        try:
+            with open(self.journal_file, 'a+', encoding='utf-8') as journal:
+                self._lock_file(journal)
+
+                # Записи, добавленные другим процессом (FastMonitor), не теряем
+                self._replay_journal(self._ids)
+
+                # Группировка по часу: снапшот компактнее словаря ID -> время
+                # и загружается без разбора времени каждого ID
+                buckets = {}
+                for item_id, ts in self._ids.items():
+                    bucket = ts - ts % BUCKET_SECONDS + BUCKET_SECONDS
+                    buckets.setdefault(bucket, []).append(item_id)
+
+                tmp_file = self.snapshot_file.with_suffix('.tmp')
+                with open(tmp_file, 'wb') as f:
+                    jsoncodec.dump({'buckets': buckets}, f, pretty=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.snapshot_file)
+
+                if truncate_journal:
+                    journal.seek(0)
+                    journal.truncate()
+                    self._journal_size = 0
+
+            print(f"🗜️ seen_ids сжат: {len(self._ids)} ID в снапшоте")
+        except Exception as e:
+            print(f"❌ Ошибка сохранения снапшота seen_ids: {e}")
+
+    @staticmethod
+    def _lock_file(f):
+        """Эксклюзивная блокировка файла до его закрытия (между процессами)"""
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
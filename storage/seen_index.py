@@ -0,0 +1,369 @@
+# storage/seen_index.py - компактный бинарный индекс просмотренных ID (uint64 + mmap)
+import bisect
+import mmap
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+import numpy as np
+
+from utils import jsoncodec
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+MAX_UINT64 = 2 ** 64 - 1
+
+
+def _in_sorted(ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Маска values, которые есть в отсортированном массиве ids (бинарный поиск)"""
+    if not len(ids):
+        return np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(ids, values), len(ids) - 1)
+    return ids[pos] == values
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    """Сортировка без повторов (np.unique в NumPy 2 идет через хеш и в разы медленнее)"""
+    values = np.sort(values)
+    if len(values) < 2:
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+class SortedIdsFile:
+    """Отсортированный массив uint64 в файле, отображенный в память через mmap"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = None
+        self._mmap = None
+        self._view = memoryview(b'').cast('Q')
+        self.open()
+
+    def open(self):
+        """Отображение файла в память (без чтения и разбора содержимого)"""
+        self.close()
+        if not self.path.exists() or self.path.stat().st_size < 8:
+            return
+
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap).cast('Q')
+
+    def close(self):
+        self._view.release()
+        self._view = memoryview(b'').cast('Q')
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def __contains__(self, value: int) -> bool:
+        view = self._view
+        pos = bisect.bisect_left(view, value)
+        return pos < len(view) and view[pos] == value
+
+    def __iter__(self):
+        return iter(self._view)
+
+    def as_array(self) -> np.ndarray:
+        """Массив NumPy поверх mmap (без копирования)"""
+        if self._mmap is None:
+            return np.empty(0, dtype=np.uint64)
+        return np.frombuffer(self._mmap, dtype=np.uint64, count=len(self._view))
+
+    @staticmethod
+    def write(path: Path, values: np.ndarray):
+        """Атомарная запись массива uint64 (уже отсортированного и без повторов)"""
+        data = np.asarray(values, dtype=np.uint64)  # Порядок байт - родной для машины
+
+        tmp_file = Path(path).with_suffix('.tmp')
+        with open(tmp_file, 'wb') as f:
+            data.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+
+class MmapSeenIndex:
+    """Просмотренные ID как отсортированные uint64 в mmap-файле
+
+    Числовые ID Goofish («1012132891104») хранятся по 8 байт вместо ~100
+    байт на str в set. Новые ID попадают в небольшую дельту в памяти и в
+    журнал (для восстановления после перезапуска); когда дельта вырастает до
+    merge_every, она сливается с основным файлом. При старте файл только
+    отображается в память - разбор JSON не нужен.
+
+    Срок хранения реализован поколениями: раз в retention_minutes / 2
+    текущий файл становится предыдущим, а предыдущий удаляется. Каждый ID
+    помнится не меньше половины retention_minutes.
+    """
+
+    def __init__(self, index_file: Path, journal_file: Path, merge_every: int = 50000,
+                 retention_minutes: Optional[float] = None, legacy_file: Optional[Path] = None):
+        self.index_file = Path(index_file)
+        self.legacy_file = Path(legacy_file) if legacy_file else None  # seen_ids.json для импорта
+        self.previous_file = self.index_file.with_suffix('.prev' + self.index_file.suffix)
+        self.meta_file = self.index_file.with_suffix('.meta.json')
+        self.journal_file = Path(journal_file)
+        self.merge_every = merge_every
+        self.retention_minutes = retention_minutes
+        self._current = None
+        self._previous = None
+        self._delta: Set[int] = set()
+        self._other: Set[str] = set()  # Нечисловые ID (на случай смены формата)
+        self._rotated_at = time.time()
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # ---------- Загрузка ----------
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def load(self):
+        """Отображение файлов поколений в память и воспроизведение журнала"""
+        with self._lock:
+            self.index_file.parent.mkdir(exist_ok=True)
+            self._current = SortedIdsFile(self.index_file)
+            self._previous = SortedIdsFile(self.previous_file)
+            self._rotated_at = self._read_meta().get('rotated_at', time.time())
+            self._delta, self._other = set(), set()
+            self._replay_journal()
+            self._loaded = True
+
+            if not self.index_file.exists() and self.legacy_file and self.legacy_file.exists():
+                self._import_legacy()
+
+            if len(self._delta) >= self.merge_every:
+                self.compact()
+
+    def _import_legacy(self):
+        """Однократный импорт ID из seen_ids.json (любого формата SeenIdsStore)"""
+        try:
+            with open(self.legacy_file, 'rb') as f:
+                data = jsoncodec.load(f)
+        except Exception as e:
+            print(f"❌ Ошибка импорта {self.legacy_file}: {e}")
+            return
+
+        ids = list(data.get('seen_ids', []))
+        for bucket_ids in data.get('buckets', {}).values():
+            ids.extend(bucket_ids)
+
+        journal_ids = set(map(str, self._delta)) | self._other
+        self.replace(ids)
+        self.add(journal_ids)
+        print(f"📥 seen_ids: импортировано {len(ids)} ID из {self.legacy_file.name}")
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self.meta_file, 'rb') as f:
+                return jsoncodec.load(f)
+        except Exception:
+            return {}
+
+    def _write_meta(self):
+        with open(self.meta_file, 'wb') as f:
+            jsoncodec.dump({'rotated_at': self._rotated_at}, f)
+
+    def _replay_journal(self):
+        if not self.journal_file.exists():
+            return
+
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    item_id = line.strip().partition('\t')[0]
+                    if item_id:
+                        self._add_to_delta(item_id)
+        except Exception as e:
+            print(f"❌ Ошибка чтения журнала seen_ids: {e}")
+
+    @staticmethod
+    def _to_int(item_id: str) -> Optional[int]:
+        if item_id.isdigit():
+            value = int(item_id)
+            if value <= MAX_UINT64:
+                return value
+        return None
+
+    def _add_to_delta(self, item_id: str):
+        value = self._to_int(item_id)
+        if value is None:
+            self._other.add(item_id)
+        else:
+            self._delta.add(value)
+
+    # ---------- Чтение ----------
+
+    def __contains__(self, item_id) -> bool:
+        self._ensure_loaded()
+        item_id = str(item_id)
+        value = self._to_int(item_id)
+        if value is None:
+            return item_id in self._other
+        return value in self._delta or value in self._current or value in self._previous
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        # Поколения могут пересекаться только при ручной замене - считаем приблизительно
+        return len(self._current) + len(self._previous) + len(self._delta) + len(self._other)
+
+    def contains_array(self, values):
+        """Векторная проверка массива uint64: маска уже просмотренных ID"""
+        self._ensure_loaded()
+
+        with self._lock:
+            values = np.asarray(values, dtype=np.uint64)
+            found = np.zeros(len(values), dtype=bool)
+            for generation in (self._current, self._previous):
+                found |= _in_sorted(generation.as_array(), values)
+            if self._delta:
+                delta = np.fromiter(self._delta, dtype=np.uint64, count=len(self._delta))
+                found |= np.isin(values, delta)
+            return found
+
+    def snapshot(self) -> Set[str]:
+        """Копия множества ID (дорого - только для совместимости с load_seen_ids)"""
+        self._ensure_loaded()
+        with self._lock:
+            ids = set(map(str, self._current))
+            ids.update(map(str, self._previous))
+            ids.update(map(str, self._delta))
+            ids.update(self._other)
+            return ids
+
+    # ---------- Запись ----------
+
+    def add(self, ids: Iterable[str]) -> int:
+        """Добавление ID в дельту и журнал. Возвращает число новых"""
+        self._ensure_loaded()
+
+        with self._lock:
+            new_ids = [str(i) for i in ids]
+            new_ids = [i for i in dict.fromkeys(new_ids) if i not in self]
+
+            if new_ids:
+                for item_id in new_ids:
+                    self._add_to_delta(item_id)
+
+                try:
+                    with open(self.journal_file, 'a', encoding='utf-8') as f:
+                        self._lock_file(f)
+                        f.write(''.join(f"{item_id}\n" for item_id in new_ids))
+                        f.flush()
+                except Exception as e:
+                    print(f"❌ Ошибка записи журнала seen_ids: {e}")
+
+            if self._rotation_due():
+                self.expire()
+            elif len(self._delta) >= self.merge_every:
+                self.compact()
+
+            return len(new_ids)
+
+    def _rotation_due(self) -> bool:
+        if not self.retention_minutes:
+            return False
+        return time.time() - self._rotated_at >= self.retention_minutes * 60 / 2
+
+    def expire(self, now: float = None) -> int:
+        """Смена поколения: текущий файл становится предыдущим, предыдущий удаляется"""
+        self._ensure_loaded()
+
+        with self._lock:
+            self.compact()
+            dropped = len(self._previous)
+
+            self._current.close()
+            self._previous.close()
+            if self.index_file.exists():
+                os.replace(self.index_file, self.previous_file)
+            elif self.previous_file.exists():
+                self.previous_file.unlink()
+
+            self._rotated_at = now or time.time()
+            self._write_meta()
+            self._current = SortedIdsFile(self.index_file)
+            self._previous = SortedIdsFile(self.previous_file)
+
+            if dropped:
+                print(f"🧹 seen_ids: удалено поколение из {dropped} ID")
+            return dropped
+
+    def compact(self):
+        """Слияние дельты с текущим файлом поколения"""
+        self._ensure_loaded()
+
+        with self._lock:
+            try:
+                with open(self.journal_file, 'a+', encoding='utf-8') as journal:
+                    self._lock_file(journal)
+
+                    # Записи, добавленные другим процессом (FastMonitor), не теряем
+                    self._replay_journal()
+                    delta = _sorted_unique(np.fromiter(self._delta, dtype=np.uint64, count=len(self._delta)))
+                    current = self._current.as_array()
+                    delta = delta[~(_in_sorted(self._previous.as_array(), delta) | _in_sorted(current, delta))]
+
+                    if len(delta):
+                        # Файл уже отсортирован: дельта вставляется на свои места за один проход
+                        merged = np.insert(current, np.searchsorted(current, delta), delta)
+                        del current
+                        self._current.close()
+                        SortedIdsFile.write(self.index_file, merged)
+                        self._current.open()
+
+                    journal.seek(0)
+                    journal.truncate()
+                    # Нечисловые ID в файл не попадают - оставляем их в журнале
+                    if self._other:
+                        journal.write(''.join(f"{item_id}\n" for item_id in self._other))
+                    self._delta = set()
+
+                print(f"🗜️ seen_ids: дельта слита, в индексе {len(self._current)} ID")
+            except Exception as e:
+                print(f"❌ Ошибка слияния индекса seen_ids: {e}")
+
+    def replace(self, ids: Iterable[str]):
+        """Полная замена множества (совместимость с save_seen_ids)"""
+        with self._lock:
+            self._ensure_loaded()
+            values: List[int] = []
+            self._other = set()
+            for item_id in map(str, ids):
+                value = self._to_int(item_id)
+                if value is None:
+                    self._other.add(item_id)
+                else:
+                    values.append(value)
+
+            self._current.close()
+            self._previous.close()
+            SortedIdsFile.write(self.index_file, _sorted_unique(np.array(values, dtype=np.uint64)))
+            if self.previous_file.exists():
+                self.previous_file.unlink()
+            self._current.open()
+            self._previous.open()
+
+            self._delta = set()
+            with open(self.journal_file, 'w', encoding='utf-8') as f:
+                f.write(''.join(f"{item_id}\n" for item_id in self._other))
+
+    @staticmethod
+    def _lock_file(f):
+        """Эксклюзивная блокировка файла до его закрытия (между процессами)"""
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
@@ -0,0 +1,91 @@
+# storage/subscription_index.py - обратный индекс подписок: запрос -> пользователи
+import threading
+from typing import Dict, Iterable, List, Set
+
+
+class SubscriptionIndex:
+    """Обратный индекс персональных подписок
+
+    Хранит для каждого запроса множество подписанных пользователей и
+    обновляется на месте при изменении запросов пользователя, поэтому
+    получатели товаров по запросу находятся за O(получателей), без обхода
+    всех пользователей и их списков запросов.
+    """
+
+    def __init__(self):
+        self._by_query: Dict[str, Set[int]] = {}
+        self._personal_users: Set[int] = set()  # Пользователи с персональным списком (даже пустым)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_subscriptions(cls, subscriptions: Dict) -> 'SubscriptionIndex':
+        index = cls()
+        index.rebuild(subscriptions)
+        return index
+
+    def rebuild(self, subscriptions: Dict):
+        """Полная перестройка по словарю user_id -> [запросы]"""
+        with self._lock:
+            self._by_query = {}
+            self._personal_users = set()
+            for user_key, queries in subscriptions.items():
+                try:
+                    user_id = int(user_key)
+                except (TypeError, ValueError):
+                    continue
+                self._personal_users.add(user_id)
+                self._add(user_id, queries)
+
+    def _add(self, user_id: int, queries: Iterable[str]):
+        for query in queries:
+            if query:
+                self._by_query.setdefault(query, set()).add(user_id)
+
+    def _remove(self, user_id: int, queries: Iterable[str]):
+        for query in queries:
+            users = self._by_query.get(query)
+            if users is None:
+                continue
+            users.discard(user_id)
+            if not users:
+                del self._by_query[query]
+
+    def set_user_queries(self, user_id: int, old_queries: Iterable[str], new_queries: Iterable[str]):
+        """Замена списка запросов пользователя (меняются только отличающиеся запросы)"""
+        old_queries, new_queries = set(old_queries), set(new_queries)
+        with self._lock:
+            self._remove(int(user_id), old_queries - new_queries)
+            self._add(int(user_id), new_queries - old_queries)
+            self._personal_users.add(int(user_id))
+
+    def remove_user(self, user_id: int, old_queries: Iterable[str]):
+        """Пользователь больше не имеет персонального списка"""
+        with self._lock:
+            self._remove(int(user_id), old_queries)
+            self._personal_users.discard(int(user_id))
+
+    def subscribers(self, query: str) -> Set[int]:
+        """Пользователи, подписанные на запрос"""
+        with self._lock:
+            return set(self._by_query.get(query, ()))
+
+    @property
+    def personal_users(self) -> Set[int]:
+        return self._personal_users
+
+    def queries(self) -> List[str]:
+        """Запросы, на которые есть подписки - копия, безопасная для обхода"""
+        with self._lock:
+            return list(self._by_query)
+
+    def subscriber_count(self, query: str) -> int:
+        with self._lock:
+            return len(self._by_query.get(query, ()))
+
+    def has_subscribers_among(self, query: str, user_ids: Set[int]) -> bool:
+        """Есть ли среди подписчиков запроса кто-то из user_ids (до первого совпадения)"""
+        with self._lock:
+            return any(user_id in user_ids for user_id in self._by_query.get(query, ()))
+
+    def __len__(self) -> int:
+        return len(self._by_query)
@@ -0,0 +1,87 @@
+# utils/budget.py - часовой бюджет запросов к Goofish (MAX_REQUESTS_PER_HOUR)
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from config import MAX_REQUESTS_PER_HOUR, BUDGET_LOW_SHARE
+
+
+class RequestBudget:
+    """Скользящее окно запросов за последний час
+
+    Остаток бюджета распределяется по остатку окна равномерно: интервал до
+    следующего запроса - (время до выхода из окна самого старого запроса) /
+    (сколько запросов еще можно сделать). Всплеск /search в начале часа
+    растягивает интервалы мониторинга до конца окна, поэтому бюджет не
+    выбирается за первые минуты и мониторинг не встает. Жесткий предел - не
+    больше max_per_hour запросов в любом часовом окне.
+
+    Когда свободной доли бюджета остается меньше low_share, pages_allowed()
+    уменьшает глубину обхода запросов: проверка продолжается, но по первым
+    страницам.
+    """
+
+    def __init__(self, max_per_hour: int = MAX_REQUESTS_PER_HOUR,
+                 low_share: float = BUDGET_LOW_SHARE, window: float = 3600):
+        self.max_per_hour = max(1, int(max_per_hour))
+        self.low_share = low_share
+        self.window = window
+        self._times = deque()  # Время (monotonic) запросов в окне
+        self._lock = threading.Lock()
+        self.pages_cut = 0  # Сколько страниц не запрошено из-за нехватки бюджета
+
+    def _trim(self, now: float):
+        while self._times and self._times[0] <= now - self.window:
+            self._times.popleft()
+
+    def next_slot(self, now: float = None) -> float:
+        """Самое раннее время (monotonic), когда бюджет позволяет следующий запрос"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._trim(now)
+            if not self._times:
+                return now
+            remaining = self.max_per_hour - len(self._times)
+            if remaining <= 0:
+                # Бюджет исчерпан - ждем, пока запрос выйдет из окна
+                return max(now, self._times[-self.max_per_hour] + self.window)
+            last = self._times[-1]
+            window_end = self._times[0] + self.window
+            return max(now, last + max(0.0, window_end - last) / remaining)
+
+    def record(self, at: float = None):
+        """Учет запроса, который уйдет в момент at"""
+        with self._lock:
+            self._times.append(time.monotonic() if at is None else at)
+
+    def used(self) -> int:
+        with self._lock:
+            self._trim(time.monotonic())
+            return len(self._times)
+
+    def remaining_share(self) -> float:
+        return max(0.0, 1 - self.used() / self.max_per_hour)
+
+    def pages_allowed(self, pages: int) -> int:
+        """Сколько страниц из pages можно запросить при текущем остатке бюджета"""
+        share = self.remaining_share()
+        if share >= self.low_share or pages <= 1:
+            return pages
+        allowed = max(1, math.ceil(pages * share / self.low_share))
+        self.pages_cut += pages - allowed
+        return allowed
+
+    def get_stats(self) -> Dict:
+        used = self.used()
+        return {
+            'max_per_hour': self.max_per_hour,
+            'used_last_hour': used,
+            'remaining': max(0, self.max_per_hour - used),
+            'pages_cut': self.pages_cut,
+        }
+
+
+# Общий бюджет процесса: его расходуют все запросы через rate_limiter
+request_budget = RequestBudget()
@@ -0,0 +1,110 @@
+# utils/jsoncodec.py - единый JSON-кодек: orjson, если установлен, иначе стандартный json
+import json
+from typing import IO, Any, Tuple, Union
+
+from config import JSON_CODEC, JSON_PRETTY
+
+try:
+    import orjson
+except ImportError:  # Необязательная зависимость
+    orjson = None
+
+ORJSON_AVAILABLE = orjson is not None
+
+JSONDecodeError = json.JSONDecodeError
+_raw_decoder = json.JSONDecoder()
+
+
+class StdlibCodec:
+    """Стандартный json: компактный вывод, без экранирования не-ASCII"""
+
+    name = 'json'
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any, pretty: bool = False) -> str:
+        if pretty:
+            return json.dumps(obj, ensure_ascii=False, indent=2)
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps_bytes(self, obj: Any, pretty: bool = False) -> bytes:
+        return self.dumps(obj, pretty).encode('utf-8')
+
+
+class OrjsonCodec:
+    """orjson: разбор и запись в несколько раз быстрее, сразу в UTF-8 байты
+
+    Ключи-числа (корзины seen_ids) приводятся к строкам, как в json.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any, pretty: bool = False) -> str:
+        return self.dumps_bytes(obj, pretty).decode('utf-8')
+
+    def dumps_bytes(self, obj: Any, pretty: bool = False) -> bytes:
+        options = self._options | orjson.OPT_INDENT_2 if pretty else self._options
+        return orjson.dumps(obj, option=options)
+
+
+def select_codec(name: str = 'auto'):
+    """Кодек по имени: auto (orjson, если установлен), orjson или json"""
+    name = (name or 'auto').lower()
+    if name in ('auto', 'orjson') and ORJSON_AVAILABLE:
+        return OrjsonCodec()
+    if name == 'orjson':
+        print("⚠️ JSON_CODEC=orjson, но orjson не установлен - используется стандартный json")
+    return StdlibCodec()
+
+
+codec = select_codec(JSON_CODEC)
+
+
+def set_codec(name: str):
+    """Смена кодека (при запуске или в бенчмарке)"""
+    global codec
+    codec = select_codec(name)
+    return codec
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return codec.loads(data)
+
+
+def raw_decode(text: str, pos: int = 0) -> Tuple[Any, int]:
+    """Значение, начинающееся в text[pos], и позиция за ним (JSONDecodeError - пришло не целиком)
+
+    Всегда стандартный json, при любом кодеке: orjson не умеет разбирать префикс
+    строки, а поиск границы элемента сканером на Python медленнее самого raw_decode
+    (500 элементов: ~27 мс против ~4 мс), так что потоковый разбор ответов API
+    от orjson не ускоряется.
+    """
+    return _raw_decoder.raw_decode(text, pos)
+
+
+def dumps(obj: Any, pretty: bool = JSON_PRETTY) -> str:
+    return codec.dumps(obj, pretty)
+
+
+def dumps_bytes(obj: Any, pretty: bool = JSON_PRETTY) -> bytes:
+    return codec.dumps_bytes(obj, pretty)
+
+
+def load(f: IO) -> Any:
+    """Аналог json.load для файла, открытого в текстовом или бинарном режиме"""
+    return codec.loads(f.read())
+
+
+def dump(obj: Any, f: IO, pretty: bool = JSON_PRETTY):
+    """Аналог json.dump; в бинарный файл пишет байты без лишнего перекодирования"""
+    if 'b' in getattr(f, 'mode', ''):
+        f.write(codec.dumps_bytes(obj, pretty))
+    else:
+        f.write(codec.dumps(obj, pretty))
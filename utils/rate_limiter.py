@@ -0,0 +1,158 @@
+# utils/rate_limiter.py - адаптивный темп запросов к Goofish (AIMD)
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import (
+    RATE_LIMIT_FILE, RATE_LIMIT_DELAY, REQUEST_DELAY_MIN, REQUEST_DELAY_MAX,
+    RATE_INITIAL_DELAY, RATE_INCREASE_STEP, RATE_DECREASE_FACTOR, RATE_SAVE_INTERVAL
+)
+from utils import jsoncodec
+from utils.budget import RequestBudget, request_budget
+
+
+class AimdRateLimiter:
+    """Общий для всех парсеров темп запросов (запросов в секунду)
+
+    Каждый успешный ответ добавляет к темпу increase_step (аддитивный рост),
+    RGV587_ERROR или HTTP 429 делит его на decrease_factor (мультипликативный
+    спад) и приостанавливает все запросы на cooldown секунд. Темп ограничен
+    интервалами REQUEST_DELAY_MIN..REQUEST_DELAY_MAX между запросами.
+
+    Найденный темп сохраняется в RATE_LIMIT_FILE: после перезапуска парсер
+    начинает с него, а не с начального значения. Поверх темпа действует
+    часовой бюджет (budget): слот не раньше, чем позволяет он.
+    """
+
+    def __init__(self, state_file: Optional[Path] = RATE_LIMIT_FILE,
+                 initial_delay: float = RATE_INITIAL_DELAY,
+                 min_delay: float = REQUEST_DELAY_MIN, max_delay: float = REQUEST_DELAY_MAX,
+                 increase_step: float = RATE_INCREASE_STEP, decrease_factor: float = RATE_DECREASE_FACTOR,
+                 cooldown: float = RATE_LIMIT_DELAY, save_interval: float = RATE_SAVE_INTERVAL,
+                 budget: Optional[RequestBudget] = None):
+        self.budget = budget
+        self.state_file = Path(state_file) if state_file else None
+        self.max_rate = 1 / min_delay
+        self.min_rate = 1 / max_delay
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.save_interval = save_interval
+
+        self._lock = threading.RLock()
+        self._next_at = 0.0  # Время (monotonic), раньше которого следующий запрос не уходит
+        self._saved_at = 0.0
+        self.rate = self._clamp(1 / initial_delay)
+
+        self.successes = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+
+        self._load()
+
+    def _clamp(self, rate: float) -> float:
+        return min(self.max_rate, max(self.min_rate, rate))
+
+    # ---------- Ожидание очереди ----------
+
+    def next_slot(self, now: float = None) -> float:
+        """Самое раннее время (monotonic), когда можно отправить следующий запрос"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            start = max(now, self._next_at)
+        if self.budget:
+            start = max(start, self.budget.next_slot(now))
+        return start
+
+    def commit(self, start: float):
+        """Запрос отправляется в момент start: следующий слот сдвигается"""
+        with self._lock:
+            self._next_at = start + 1 / self.rate
+        if self.budget:
+            self.budget.record(start)
+
+    def _reserve(self) -> float:
+        """Занимает следующий слот в порядке вызова, возвращает сколько ждать до него"""
+        with self._lock:
+            now = time.monotonic()
+            start = self.next_slot(now)
+            self.commit(start)
+            wait = start - now
+            self.total_wait += wait
+            return wait
+
+    def acquire(self) -> float:
+        """Блокирующее ожидание слота (потоки GoofishParser)"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Ожидание слота без блокировки event loop (AsyncGoofishParser)"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    # ---------- Сигналы ----------
+
+    def on_success(self):
+        with self._lock:
+            self.successes += 1
+            self.rate = self._clamp(self.rate + self.increase_step)
+            save = time.monotonic() - self._saved_at >= self.save_interval
+        if save:
+            self._save()
+
+    def on_rate_limited(self):
+        """RGV587_ERROR / HTTP 429: темп вниз, пауза для всех запросов"""
+        with self._lock:
+            self.rate_limited += 1
+            self.rate = self._clamp(self.rate * self.decrease_factor)
+            self._next_at = max(self._next_at, time.monotonic() + self.cooldown)
+        print(f"🐢 Rate limit: темп снижен до {self.rate:.3f} запр/с "
+              f"(интервал {1 / self.rate:.1f} с), пауза {self.cooldown:.0f} с")
+        self._save()
+
+    # ---------- Сохранение темпа ----------
+
+    def _load(self):
+        if not self.state_file or not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'rb') as f:
+                state = jsoncodec.load(f)
+            self.rate = self._clamp(float(state['rate']))
+            print(f"⏱️ Темп запросов из {self.state_file.name}: {self.rate:.3f} запр/с")
+        except Exception as e:
+            print(f"⚠️ Не удалось загрузить темп запросов: {e}")
+
+    def _save(self):
+        if not self.state_file:
+            return
+        with self._lock:
+            state = {'rate': self.rate, 'updated_at': int(time.time())}
+            self._saved_at = time.monotonic()
+        try:
+            tmp_file = self.state_file.with_suffix('.tmp')
+            with open(tmp_file, 'wb') as f:
+                jsoncodec.dump(state, f)
+            tmp_file.replace(self.state_file)
+        except Exception as e:
+            print(f"⚠️ Не удалось сохранить темп запросов: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            'rate_per_second': round(self.rate, 3),
+            'interval_seconds': round(1 / self.rate, 2),
+            'successes': self.successes,
+            'rate_limited': self.rate_limited,
+            'total_wait_seconds': round(self.total_wait, 1),
+        }
+
+
+# Один темп на процесс: GoofishParser, AsyncGoofishParser и /search делят его
+rate_limiter = AimdRateLimiter(budget=request_budget)
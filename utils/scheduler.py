@@ -0,0 +1,99 @@
+# utils/scheduler.py - очередь запросов к Goofish с приоритетами (/search раньше мониторинга)
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict
+
+from utils.rate_limiter import AimdRateLimiter, rate_limiter
+
+LANE_INTERACTIVE = 'interactive'  # /search и кнопки пользователя
+LANE_FIRST_PAGE = 'first_page'  # Первая страница запроса в мониторинге
+LANE_DEEP_PAGE = 'deep_page'  # Следующие страницы глубокого обхода
+
+LANE_PRIORITY = {LANE_INTERACTIVE: 0, LANE_FIRST_PAGE: 1, LANE_DEEP_PAGE: 2}
+LANE_NAMES = {
+    LANE_INTERACTIVE: 'интерактивные',
+    LANE_FIRST_PAGE: 'первые страницы',
+    LANE_DEEP_PAGE: 'глубокие страницы',
+}
+
+
+def lane_for_page(page: int) -> str:
+    """Полоса фонового запроса по номеру страницы"""
+    return LANE_FIRST_PAGE if page <= 1 else LANE_DEEP_PAGE
+
+
+class RequestScheduler:
+    """Выдача слотов rate_limiter по приоритету полос
+
+    Ожидающие запросы стоят в одной куче (приоритет полосы, порядок
+    поступления). Слот темпа и бюджета получает только голова кучи: если
+    пока 50-страничный обход ждал свой слот, пришел /search, слот уйдет ему.
+    Темп и бюджет при этом общие - интерактивный запрос не превышает их,
+    а только обгоняет очередь.
+    """
+
+    def __init__(self, limiter: AimdRateLimiter = rate_limiter):
+        self.limiter = limiter
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._stats = {lane: {'requests': 0, 'total_wait': 0.0, 'max_wait': 0.0} for lane in LANE_PRIORITY}
+
+    def acquire(self, lane: str = LANE_FIRST_PAGE) -> float:
+        """Блокирующее ожидание слота, возвращает время в очереди"""
+        entry = (LANE_PRIORITY.get(lane, LANE_PRIORITY[LANE_DEEP_PAGE]), next(self._seq))
+        enqueued = time.monotonic()
+
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self._cond.notify_all()  # Новая голова очереди пересчитает свое ожидание
+
+            while True:
+                if self._queue[0] != entry:
+                    self._cond.wait()
+                    continue
+
+                now = time.monotonic()
+                slot = self.limiter.next_slot(now)
+                if slot <= now:
+                    heapq.heappop(self._queue)
+                    self.limiter.commit(now)
+                    self._cond.notify_all()
+                    break
+                # Ждем свой слот, но просыпаемся, если пришел более срочный запрос
+                self._cond.wait(slot - now)
+
+        waited = time.monotonic() - enqueued
+        stats = self._stats.setdefault(lane, {'requests': 0, 'total_wait': 0.0, 'max_wait': 0.0})
+        stats['requests'] += 1
+        stats['total_wait'] += waited
+        stats['max_wait'] = max(stats['max_wait'], waited)
+        self.limiter.total_wait += waited
+        return waited
+
+    async def acquire_async(self, lane: str = LANE_FIRST_PAGE) -> float:
+        """acquire() без блокировки event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.acquire, lane)
+
+    def queued(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Ожидание в очереди по полосам: запросов, среднее и максимальное (сек)"""
+        return {
+            lane: {
+                'requests': s['requests'],
+                'avg_wait': round(s['total_wait'] / s['requests'], 2) if s['requests'] else 0.0,
+                'max_wait': round(s['max_wait'], 2),
+            }
+            for lane, s in self._stats.items()
+        }
+
+
+# Одна очередь на процесс поверх общего rate_limiter
+request_scheduler = RequestScheduler()
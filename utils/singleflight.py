@@ -0,0 +1,86 @@
+# utils/singleflight.py - объединение одинаковых одновременных запросов в один
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """Выполняющийся вызов: результат ждут все, кто пришел с тем же ключом"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Одинаковые вызовы, пришедшие, пока первый еще выполняется, его и ждут
+
+    Первый вызов с ключом выполняет функцию, остальные (из других потоков
+    или задач event loop) получают тот же результат или ту же ошибку. После
+    завершения ключ освобождается: это не кэш, следующий вызов снова
+    пойдет в сеть.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0  # Вызовов, реально выполненных
+        self.shared = 0  # Вызовов, получивших чужой результат
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Вызов из потока (GoofishParser в пуле потоков)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Вызов из event loop (AsyncGoofishParser)"""
+        future = self._async_calls.get(key)
+        if future is not None:
+            self.shared += 1
+            # shield: отмена ожидающего не отменяет запрос первого
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        self.executed += 1
+        try:
+            result = await func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Ошибку получит вызвавший; без ожидающих не предупреждаем
+            raise
+        finally:
+            self._async_calls.pop(key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'executed': self.executed, 'deduplicated': self.shared}